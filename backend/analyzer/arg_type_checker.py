@@ -8,6 +8,7 @@ from typing import Any
 
 from parser.symbol_extractor import Reference, Symbol
 from analyzer.type_checker import Diagnostic
+from analyzer.repo_index import RepoIndex
 
 
 def _get_language_from_path(file_path: str):
@@ -22,6 +23,7 @@ def check_arg_types(
     buffer_symbols: list[Symbol],
     repo_symbols: list[dict[str, Any]],
     current_file: str,
+    repo_index: RepoIndex | None = None,
 ) -> list[Diagnostic]:
     diagnostics: list[Diagnostic] = []
     if _get_language_from_path(current_file) != "python":
@@ -32,7 +34,8 @@ def check_arg_types(
     for sym in buffer_symbols:
         if sym.kind == "function" and sym.params:
             func_params[sym.name] = sym.params
-    for s in repo_symbols:
+    repo_funcs = repo_index.by_kind.get("function", ()) if repo_index is not None else repo_symbols
+    for s in repo_funcs:
         if s.get("kind") == "function" and s.get("params"):
             name = s.get("name")
             if name and name not in func_params:
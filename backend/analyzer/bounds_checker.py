@@ -8,6 +8,7 @@ from typing import Any
 
 from parser.symbol_extractor import Reference, Symbol
 from analyzer.type_checker import Diagnostic
+from analyzer.repo_index import RepoIndex
 
 
 def _is_same_file(current_file: str, repo_file_path: str) -> bool:
@@ -24,41 +25,40 @@ def check_array_bounds(
     buffer_symbols: list[Symbol],
     repo_symbols: list[dict[str, Any]],
     current_file: str,
+    repo_index: RepoIndex | None = None,
 ) -> list[Diagnostic]:
     diagnostics: list[Diagnostic] = []
-    # Repo + buffer arrays by name
-    size_by_name: dict[str, int] = {}
-    def_file: dict[str, str] = {}
-    def_line: dict[str, int] = {}
+    # Repo + buffer arrays by name: (size, defining file, line)
+    arrays: dict[str, tuple[int, str, int]] = {}
 
     # Prefer canonical definition size from repo (other files); buffer extern
     # may declare wrong size - use actual definition for bounds checking
-    for s in repo_symbols:
+    repo_arrays = repo_index.arrays if repo_index is not None else repo_symbols
+    for s in repo_arrays:
         if s.get("array_size") is None:
             continue
         if _is_same_file(current_file, s.get("file_path", "")):
             continue  # skip current file – buffer has unsaved version
-        size_by_name[s["name"]] = s["array_size"]
-        def_file[s["name"]] = s.get("file_path", "")
-        def_line[s["name"]] = s.get("line", 0)
+        arrays[s["name"]] = (s["array_size"], s.get("file_path", ""), s.get("line", 0))
     for s in buffer_symbols:
-        if s.array_size is not None and s.name not in size_by_name:
-            size_by_name[s.name] = s.array_size
-            def_file[s.name] = s.file_path or current_file
-            def_line[s.name] = s.line
+        if s.array_size is not None and s.name not in arrays:
+            arrays[s.name] = (s.array_size, s.file_path or current_file, s.line)
+    if not arrays:
+        return diagnostics
 
     for ref in buffer_refs:
         if ref.kind != "array_access" or ref.index_value is None:
             continue
-        size = size_by_name.get(ref.name)
-        if size is None:
+        known = arrays.get(ref.name)
+        if known is None:
             continue
-        if ref.index_value < 0 or ref.index_value >= size:
+        size, file, line = known
+        if not 0 <= ref.index_value < size:
             diagnostics.append(Diagnostic(
                 file=current_file,
                 line=ref.line,
                 severity="ERROR",
                 code="SNIPE_ARRAY_BOUNDS",
-                message=f"Index {ref.index_value} exceeds declared size {size} for '{ref.name}' (declared in {def_file.get(ref.name, '?')}:{def_line.get(ref.name, '?')}).",
+                message=f"Index {ref.index_value} exceeds declared size {size} for '{ref.name}' (declared in {file}:{line}).",
             ))
     return diagnostics
@@ -0,0 +1,38 @@
+"""
+Shared lookup tables over the repo symbol dicts.
+Built once per symbol-table refresh so each checker only walks the symbols it
+can use (functions, structs, arrays, ...) instead of the whole repo table.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Any
+
+from parser.symbol_extractor import language_for_path
+
+
+@dataclass
+class RepoIndex:
+    by_kind: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    by_language: dict[str, list[dict[str, Any]]] = field(default_factory=dict)  # "python" / "c"
+    arrays: list[dict[str, Any]] = field(default_factory=list)  # symbols with a static array_size
+    typed: list[dict[str, Any]] = field(default_factory=list)  # symbols with a declared type
+    names: frozenset[str] = frozenset()
+
+
+def build_repo_index(repo_symbols: list[dict[str, Any]]) -> RepoIndex:
+    """Bucket repo symbols in one pass; every bucket keeps the table's original order."""
+    index = RepoIndex()
+    names: set[str] = set()
+    for s in repo_symbols:
+        index.by_kind.setdefault(s.get("kind"), []).append(s)
+        lang = language_for_path(s.get("file_path", ""))
+        if lang is not None:
+            index.by_language.setdefault(lang, []).append(s)
+        if s.get("array_size") is not None:
+            index.arrays.append(s)
+        if s.get("type"):
+            index.typed.append(s)
+        if s.get("name"):
+            names.add(s["name"])
+    index.names = frozenset(names)
+    return index
@@ -332,6 +332,18 @@ UNSAFE_FUNCTIONS: dict[str, dict[str, str]] = {
 }
 
 
+def _unsafe_message(name: str, entry: dict[str, str]) -> str:
+    return f"'{name}()' — {entry['category']}. {entry['reason']}. {entry['suggestion']}."
+
+
+# name -> (severity, message), built once so each call ref costs a single dict probe.
+# Removed functions are added last so they win over any discouraged entry.
+_UNSAFE_DISPATCH: dict[str, tuple[str, str]] = {
+    **{name: ("WARNING", _unsafe_message(name, e)) for name, e in UNSAFE_FUNCTIONS.items()},
+    **{name: ("ERROR", _unsafe_message(name, e)) for name, e in REMOVED_FUNCTIONS.items()},
+}
+
+
 def check_unsafe_functions(
     buffer_refs: list[Reference],
     buffer_symbols: list[Symbol],
@@ -345,36 +357,15 @@ def check_unsafe_functions(
     for ref in buffer_refs:
         if ref.kind != "call":
             continue
-
-        # Check removed-from-standard functions (ERROR)
-        removed = REMOVED_FUNCTIONS.get(ref.name)
-        if removed:
-            diagnostics.append(Diagnostic(
-                file=current_file,
-                line=ref.line,
-                severity="ERROR",
-                code="SNIPE_UNSAFE_FUNCTION",
-                message=(
-                    f"'{ref.name}()' — {removed['category']}. "
-                    f"{removed['reason']}. "
-                    f"{removed['suggestion']}."
-                ),
-            ))
-            continue
-
-        # Check discouraged functions (WARNING)
-        unsafe = UNSAFE_FUNCTIONS.get(ref.name)
-        if unsafe:
+        # ERROR for removed-from-standard functions, WARNING for discouraged ones
+        hit = _UNSAFE_DISPATCH.get(ref.name)
+        if hit:
             diagnostics.append(Diagnostic(
                 file=current_file,
                 line=ref.line,
-                severity="WARNING",
+                severity=hit[0],
                 code="SNIPE_UNSAFE_FUNCTION",
-                message=(
-                    f"'{ref.name}()' — {unsafe['category']}. "
-                    f"{unsafe['reason']}. "
-                    f"{unsafe['suggestion']}."
-                ),
+                message=hit[1],
             ))
 
     return diagnostics
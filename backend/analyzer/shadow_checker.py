@@ -8,6 +8,7 @@ from typing import Any
 
 from parser.symbol_extractor import Reference, Symbol
 from analyzer.type_checker import Diagnostic
+from analyzer.repo_index import RepoIndex
 
 
 def check_variable_shadowing(
@@ -15,6 +16,7 @@ def check_variable_shadowing(
     buffer_symbols: list[Symbol],
     repo_symbols: list[dict[str, Any]],
     current_file: str,
+    repo_index: RepoIndex | None = None,
 ) -> list[Diagnostic]:
     diagnostics: list[Diagnostic] = []
     ext = Path(current_file).suffix.lower()
@@ -28,7 +30,8 @@ def check_variable_shadowing(
             module_level_names[s.name] = s
 
     # Also check repo-level module symbols from same language files
-    for s in repo_symbols:
+    repo_variables = repo_index.by_kind.get("variable", ()) if repo_index is not None else repo_symbols
+    for s in repo_variables:
         if s.get("scope", "") == "" and s.get("kind") == "variable":
             fp = s.get("file_path", "")
             if fp.endswith(".py"):
@@ -7,17 +7,29 @@ from typing import Any
 
 from parser.symbol_extractor import Reference
 from analyzer.type_checker import Diagnostic
+from analyzer.repo_index import RepoIndex
+
+
+def _arg_count_bounds(func: dict[str, Any]) -> tuple[int, float]:
+    """(min, max) positional argument count accepted by a repo function symbol."""
+    # Filter out *args/**kwargs params for counting
+    regular_params = [p for p in func.get("params") or [] if not p.get("name", "").startswith("*")]
+    min_args = sum(1 for p in regular_params if not p.get("has_default", False))
+    max_args = float("inf") if func.get("is_variadic", False) else len(regular_params)
+    return min_args, max_args
 
 
 def check_function_signatures(
     buffer_refs: list[Reference],
     repo_symbols: list[dict[str, Any]],
     current_file: str,
+    repo_index: RepoIndex | None = None,
 ) -> list[Diagnostic]:
     diagnostics: list[Diagnostic] = []
     # Repo functions by name (prefer same file, then others)
     funcs: dict[str, dict] = {}
-    for s in repo_symbols:
+    repo_funcs = repo_index.by_kind.get("function", ()) if repo_index is not None else repo_symbols
+    for s in repo_funcs:
         if s.get("kind") != "function":
             continue
         name = s.get("name")
@@ -26,23 +38,22 @@ def check_function_signatures(
         if name not in funcs or s.get("file_path") == current_file:
             funcs[name] = s
 
+    # Arity per called function, worked out once however many call sites it has
+    arity: dict[str, tuple[int, float]] = {}
     for ref in buffer_refs:
         if ref.kind != "call" or ref.arg_count is None:
             continue
         repo_def = funcs.get(ref.name)
         if not repo_def:
             continue
-        params = repo_def.get("params") or []
-        is_variadic = repo_def.get("is_variadic", False)
-
-        # Filter out *args/**kwargs params for counting
-        regular_params = [p for p in params if not p.get("name", "").startswith("*")]
-        min_args = sum(1 for p in regular_params if not p.get("has_default", False))
-        max_args = float("inf") if is_variadic else len(regular_params)
+        bounds = arity.get(ref.name)
+        if bounds is None:
+            bounds = arity[ref.name] = _arg_count_bounds(repo_def)
+        min_args, max_args = bounds
 
-        if ref.arg_count < min_args or ref.arg_count > max_args:
+        if not min_args <= ref.arg_count <= max_args:
             # Build descriptive expectation string
-            if is_variadic:
+            if repo_def.get("is_variadic", False):
                 expected_str = f"at least {min_args}"
             elif min_args == max_args:
                 expected_str = f"{min_args}"
@@ -9,6 +9,7 @@ from typing import Any
 
 from parser.symbol_extractor import Reference, Symbol
 from analyzer.type_checker import Diagnostic
+from analyzer.repo_index import RepoIndex
 
 
 def check_struct_access(
@@ -16,6 +17,7 @@ def check_struct_access(
     buffer_symbols: list[Symbol],
     repo_symbols: list[dict[str, Any]],
     current_file: str,
+    repo_index: RepoIndex | None = None,
 ) -> list[Diagnostic]:
     diagnostics: list[Diagnostic] = []
     if not current_file.endswith((".c", ".h")):
@@ -26,7 +28,7 @@ def check_struct_access(
     for sym in buffer_symbols:
         if sym.type:
             var_types[sym.name] = sym.type
-    for s in repo_symbols:
+    for s in (repo_index.typed if repo_index is not None else repo_symbols):
         name = s.get("name")
         if name and s.get("type") and name not in var_types:
             var_types[name] = s["type"]
@@ -36,7 +38,7 @@ def check_struct_access(
     for sym in buffer_symbols:
         if sym.kind == "struct" and sym.members:
             struct_members[sym.name] = sym.members
-    for s in repo_symbols:
+    for s in (repo_index.by_kind.get("struct", ()) if repo_index is not None else repo_symbols):
         if s.get("kind") == "struct" and s.get("members"):
             name = s.get("name")
             if name and name not in struct_members:
@@ -9,9 +9,10 @@ from dataclasses import dataclass
 from typing import Any
 
 from parser.symbol_extractor import Symbol, Reference
+from analyzer.repo_index import RepoIndex
 
 
-@dataclass
+@dataclass(slots=True)
 class Diagnostic:
     file: str
     line: int
@@ -44,6 +45,7 @@ def check_type_mismatch(
     buffer_symbols: list[Symbol],
     repo_symbols: list[dict[str, Any]],
     current_file: str,
+    repo_index: RepoIndex | None = None,
 ) -> list[Diagnostic]:
     diagnostics: list[Diagnostic] = []
     current_lang = _get_language_from_path(current_file)
@@ -56,12 +58,14 @@ def check_type_mismatch(
 
     # Repo symbol map by name (same language only; prefer definitions over extern)
     repo_by_name: dict[str, dict] = {}
-    for s in repo_symbols:
+    if repo_index is not None:
+        # Pre-bucketed by language, so no cross-language symbols to skip
+        same_lang = repo_index.by_language.get(current_lang, ())
+    else:
+        same_lang = (s for s in repo_symbols if _get_language_from_path(s.get("file_path", "")) == current_lang)
+    for s in same_lang:
         if _is_same_file(current_file, s.get("file_path", "")):
             continue  # skip same-file, we use buffer symbols
-        repo_lang = _get_language_from_path(s.get("file_path", ""))
-        if repo_lang != current_lang:
-            continue  # skip cross-language
         name = s.get("name")
         if not name:
             continue
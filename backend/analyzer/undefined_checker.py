@@ -9,6 +9,7 @@ from typing import Any
 
 from parser.symbol_extractor import Reference, Symbol
 from analyzer.type_checker import Diagnostic
+from analyzer.repo_index import RepoIndex
 
 # Python builtins that should never be flagged
 PYTHON_BUILTINS = {
@@ -109,6 +110,13 @@ C_STDLIB_FUNCTIONS = {
 }
 
 
+# Names that are always defined, per language
+_LANGUAGE_KNOWN_NAMES: dict[str, frozenset[str]] = {
+    "python": frozenset(PYTHON_BUILTINS | PYTHON_COMMON_GLOBALS),
+    "c": frozenset(C_STDLIB_FUNCTIONS),
+}
+
+
 def _get_language_from_path(file_path: str):
     ext = Path(file_path).suffix.lower()
     if ext in (".c", ".h"):
@@ -123,27 +131,26 @@ def check_undefined_symbols(
     buffer_symbols: list[Symbol],
     repo_symbols: list[dict[str, Any]],
     current_file: str,
+    repo_index: RepoIndex | None = None,
 ) -> list[Diagnostic]:
     diagnostics: list[Diagnostic] = []
     lang = _get_language_from_path(current_file)
     if lang is None:
         return diagnostics
 
-    # Build set of known symbol names
-    buffer_names = {s.name for s in buffer_symbols}
-    repo_names = {s.get("name") for s in repo_symbols if s.get("name")}
-
-    # Collect imported names from import references
-    imported_names: set[str] = set()
+    # Known names: the buffer's own symbols and imports, plus the language's
+    # builtins and the repo table, which are probed in place rather than copied
+    local_names = {s.name for s in buffer_symbols}
     for ref in buffer_refs:
         if ref.kind == "import" and ref.imported_names:
-            imported_names.update(ref.imported_names)
-
-    all_known = buffer_names | repo_names | imported_names
+            local_names.update(ref.imported_names)
+    builtin_names = _LANGUAGE_KNOWN_NAMES[lang]
+    if repo_index is not None:
+        repo_names = repo_index.names
+    else:
+        repo_names = {s.get("name") for s in repo_symbols if s.get("name")}
 
     if lang == "python":
-        all_known |= PYTHON_BUILTINS | PYTHON_COMMON_GLOBALS
-
         # Check if file has a star import — if so, suppress undefined warnings
         has_star_import = False
         for ref in buffer_refs:
@@ -158,7 +165,8 @@ def check_undefined_symbols(
         for ref in buffer_refs:
             if ref.kind != "read":
                 continue
-            if ref.name in all_known:
+            name = ref.name
+            if name in local_names or name in builtin_names or name in repo_names:
                 continue
             diagnostics.append(Diagnostic(
                 file=current_file,
@@ -175,7 +183,8 @@ def check_undefined_symbols(
             # Skip method calls (contain dots like obj.method)
             if "." in ref.name:
                 continue
-            if ref.name in all_known:
+            name = ref.name
+            if name in local_names or name in builtin_names or name in repo_names:
                 continue
             diagnostics.append(Diagnostic(
                 file=current_file,
@@ -186,13 +195,12 @@ def check_undefined_symbols(
             ))
 
     elif lang == "c":
-        all_known |= C_STDLIB_FUNCTIONS
-
         # #10: Undefined function call (C)
         for ref in buffer_refs:
             if ref.kind != "call":
                 continue
-            if ref.name in all_known:
+            name = ref.name
+            if name in local_names or name in builtin_names or name in repo_names:
                 continue
             diagnostics.append(Diagnostic(
                 file=current_file,
@@ -51,6 +51,7 @@ class AIExplainer:
         self.google_key = google_key or os.getenv("GOOGLE_API_KEY")
 
         self.claude_client = None
+        self.claude_async_client = None  # created on first async use, inside the server's event loop
         self.gemini_client = None
         self.enabled = False
         self.provider = None
@@ -85,25 +86,8 @@ class AIExplainer:
         else:
             log.warning("Failed to initialize any AI provider. AI explanations disabled.")
 
-    def explain_diagnostic(
-        self,
-        diagnostic: dict,
-        code_context: str
-    ) -> Optional[str]:
-        """
-        Generate a clear explanation for a diagnostic error/warning.
-
-        Args:
-            diagnostic: Dictionary with keys: message, severity, code, file, line
-            code_context: Relevant code snippet around the error
-
-        Returns:
-            AI-generated explanation or None if disabled/failed
-        """
-        if not self.enabled:
-            return None
-
-        # Build prompt
+    def _build_prompt(self, diagnostic: dict, code_context: str) -> str:
+        """Build the explanation prompt for one diagnostic."""
         error_message = diagnostic.get("message", "Unknown error")
         severity = diagnostic.get("severity", "error")
         code = diagnostic.get("code", "")
@@ -129,52 +113,139 @@ Explain this error in exactly this format (plain text only, no markdown):
 - HOW TO FIX IT: [one sentence fix]
 
 Use exactly these headers. Keep it under 50 words total. Be direct and actionable."""
+        return prompt
+
+    def _ensure_gemini_fallback(self) -> bool:
+        """Create the Gemini client on demand when Claude fails; False if unavailable."""
+        if not self.gemini_client and HAS_GEMINI and self.google_key:
+            try:
+                self.gemini_client = genai.Client(api_key=self.google_key)
+            except Exception as e:
+                log.error(f"Failed to initialize Gemini fallback: {e}")
+                return False
+        return self.gemini_client is not None
+
+    # Request arguments and response handling shared by the sync and async paths;
+    # only the client call itself differs between explain_diagnostic and aexplain_diagnostic.
+
+    def _claude_request(self, prompt: str) -> dict:
+        return {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 300,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+        }
+
+    def _gemini_request(self, prompt: str) -> dict:
+        return {
+            "model": "gemini-2.5-flash",
+            "contents": prompt,
+        }
+
+    def _claude_explanation(self, response, error_message: str) -> Optional[str]:
+        if response and response.content:
+            explanation = response.content[0].text.strip()
+            log.info(f"Generated AI explanation (Claude) for: {error_message[:50]}")
+            return explanation
+        log.warning("Empty response from Claude")
+        return None
+
+    def _gemini_explanation(self, response, error_message: str) -> Optional[str]:
+        if response and response.text:
+            explanation = response.text.strip()
+            log.info(f"Generated AI explanation (Gemini) for: {error_message[:50]}")
+            return explanation
+        log.warning("Empty response from Gemini")
+        return None
+
+    def _claude_failed(self, e: Exception) -> None:
+        log.error(f"Failed to generate Claude explanation: {e}")
+        log.info("Falling back to Gemini...")
+
+    def _gemini_failed(self, e: Exception) -> None:
+        log.error(f"Failed to generate Gemini explanation: {e}")
+
+    def explain_diagnostic(
+        self,
+        diagnostic: dict,
+        code_context: str
+    ) -> Optional[str]:
+        """
+        Generate a clear explanation for a diagnostic error/warning.
+
+        Args:
+            diagnostic: Dictionary with keys: message, severity, code, file, line
+            code_context: Relevant code snippet around the error
+
+        Returns:
+            AI-generated explanation or None if disabled/failed
+        """
+        if not self.enabled:
+            return None
+
+        error_message = diagnostic.get("message", "Unknown error")
+        prompt = self._build_prompt(diagnostic, code_context)
 
         # Try Claude first
         if self.provider == "claude" and self.claude_client:
             try:
-                response = self.claude_client.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=300,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-
-                if response and response.content:
-                    explanation = response.content[0].text.strip()
-                    log.info(f"Generated AI explanation (Claude) for: {error_message[:50]}")
-                    return explanation
-                else:
-                    log.warning("Empty response from Claude")
-                    return None
+                response = self.claude_client.messages.create(**self._claude_request(prompt))
+                return self._claude_explanation(response, error_message)
             except Exception as e:
-                log.error(f"Failed to generate Claude explanation: {e}")
-                log.info("Falling back to Gemini...")
+                self._claude_failed(e)
 
         # Fall back to Gemini (initialize if not already done)
-        if not self.gemini_client and HAS_GEMINI and self.google_key:
+        if self._ensure_gemini_fallback():
             try:
-                self.gemini_client = genai.Client(api_key=self.google_key)
+                response = self.gemini_client.models.generate_content(**self._gemini_request(prompt))
+                return self._gemini_explanation(response, error_message)
             except Exception as e:
-                log.error(f"Failed to initialize Gemini fallback: {e}")
+                self._gemini_failed(e)
                 return None
-        if self.gemini_client:
+
+        return None
+
+    async def aexplain_diagnostic(
+        self,
+        diagnostic: dict,
+        code_context: str
+    ) -> Optional[str]:
+        """
+        Async variant of explain_diagnostic for the server's event loop.
+        Uses the SDKs' async clients, which keep pooled keep-alive connections
+        between requests instead of holding a worker thread for the round-trip.
+
+        Args:
+            diagnostic: Dictionary with keys: message, severity, code, file, line
+            code_context: Relevant code snippet around the error
+
+        Returns:
+            AI-generated explanation or None if disabled/failed
+        """
+        if not self.enabled:
+            return None
+
+        error_message = diagnostic.get("message", "Unknown error")
+        prompt = self._build_prompt(diagnostic, code_context)
+
+        # Try Claude first
+        if self.provider == "claude" and self.claude_client:
+            try:
+                if self.claude_async_client is None:
+                    self.claude_async_client = anthropic.AsyncAnthropic(api_key=self.anthropic_key)
+                response = await self.claude_async_client.messages.create(**self._claude_request(prompt))
+                return self._claude_explanation(response, error_message)
+            except Exception as e:
+                self._claude_failed(e)
+
+        # Fall back to Gemini (initialize if not already done)
+        if self._ensure_gemini_fallback():
             try:
-                response = self.gemini_client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    contents=prompt
-                )
-
-                if response and response.text:
-                    explanation = response.text.strip()
-                    log.info(f"Generated AI explanation (Gemini) for: {error_message[:50]}")
-                    return explanation
-                else:
-                    log.warning("Empty response from Gemini")
-                    return None
+                response = await self.gemini_client.aio.models.generate_content(**self._gemini_request(prompt))
+                return self._gemini_explanation(response, error_message)
             except Exception as e:
-                log.error(f"Failed to generate Gemini explanation: {e}")
+                self._gemini_failed(e)
                 return None
 
         return None
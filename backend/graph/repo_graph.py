@@ -86,8 +86,15 @@ def build_repo_graph(symbols: list[dict[str, Any]], diagnostics: list[dict] = No
         })
 
     # Pre-build a set of files that have *any* diagnostic error so the
-    # FILE node hasErrors flag can be set in O(1) per file.
+    # FILE node hasErrors flag can be set in O(1) per file, and the same
+    # for (file, line) pairs so SYMBOL nodes don't rescan every diagnostic.
     file_errors = {d['file']: True for d in normalized_diagnostics}
+    # Lines come from clients via /save_diagnostics; only numbers can equal a
+    # symbol's line, so anything else (and anything unhashable) is skipped.
+    line_errors = {
+        (d['file'], d['line']) for d in normalized_diagnostics
+        if isinstance(d['line'], (int, float))
+    }
 
     # ------------------------------------------------------------------
     # Pass 1 — Group symbols by file path (relative or absolute as stored
@@ -126,10 +133,7 @@ def build_repo_graph(symbols: list[dict[str, Any]], diagnostics: list[dict] = No
             # A symbol has an error only when the diagnostic points to its
             # exact line — this lets us highlight individual symbols without
             # polluting every symbol in an errored file.
-            symbol_has_error = any(
-                d['file'] == file_basename and d['line'] == symbol.get('line')
-                for d in normalized_diagnostics
-            )
+            symbol_has_error = (file_basename, symbol.get('line')) in line_errors
 
             # SYMBOL node — shape chosen by `kind` in the D3 renderer:
             #   function → circle, variable → square, array → diamond
@@ -155,18 +159,24 @@ def build_repo_graph(symbols: list[dict[str, Any]], diagnostics: list[dict] = No
     # Pass 3 — REFERENCES edges.
     # Any symbol label shared across two or more files gets cross-file
     # edges so the viewer can spot shared identifiers at a glance.
-    # We only add edges between distinct occurrences (pairs, not self-loops).
+    # We only add edges between distinct occurrences (pairs, not self-loops),
+    # and never across languages (e.g. a C symbol matching a Python symbol
+    # by name — these are coincidental, not real deps).
     # ------------------------------------------------------------------
-    name_map: dict[str, list[str]] = {}
+    name_map: dict[str, list[tuple[str, str]]] = {}
     for node in nodes:
         if node['kind'] != 'file':
-            name_map.setdefault(node['label'], []).append(node['id'])
+            name_map.setdefault(node['label'], []).append(
+                (node['id'], get_language(node['file_path']))
+            )
 
     for ids in name_map.values():
         if len(ids) >= 2:
             # Emit one edge per ordered pair to avoid duplicate edges.
-            for i, src in enumerate(ids):
-                for tgt in ids[i + 1:]:
+            for i, (src, src_lang) in enumerate(ids):
+                for tgt, tgt_lang in ids[i + 1:]:
+                    if src_lang != tgt_lang:
+                        continue
                     edges.append({
                         "source": src,
                         "target": tgt,
@@ -179,6 +189,8 @@ def build_repo_graph(symbols: list[dict[str, Any]], diagnostics: list[dict] = No
     # new special nodes + edges so the viewer can see file-level deps.
     # ------------------------------------------------------------------
     existing_node_ids: set[str] = {n['id'] for n in nodes}
+    # Source text per file, kept for the CALLS pass so each file is read once.
+    file_sources: dict[str, str] = {}
 
     for node in list(nodes):  # snapshot — we append inside the loop
         if node['kind'] != 'file':
@@ -194,6 +206,7 @@ def build_repo_graph(symbols: list[dict[str, Any]], diagnostics: list[dict] = No
             code = Path(abs_fp).read_text(encoding='utf-8', errors='replace')
         except OSError:
             continue
+        file_sources[fp] = code
 
         if fp.endswith(('.c', '.h')):
             for inc in extract_includes(code, fp):
@@ -252,13 +265,15 @@ def build_repo_graph(symbols: list[dict[str, Any]], diagnostics: list[dict] = No
             file_func_nodes.setdefault(fp, []).append(node)
 
     for fp, func_nodes in file_func_nodes.items():
-        abs_fp = fp
-        if repo_path and not os.path.isabs(fp):
-            abs_fp = os.path.join(repo_path, fp)
-        try:
-            code = Path(abs_fp).read_text(encoding='utf-8', errors='replace')
-        except OSError:
-            continue
+        code = file_sources.get(fp)
+        if code is None:
+            abs_fp = fp
+            if repo_path and not os.path.isabs(fp):
+                abs_fp = os.path.join(repo_path, fp)
+            try:
+                code = Path(abs_fp).read_text(encoding='utf-8', errors='replace')
+            except OSError:
+                continue
 
         # Build symbol dicts for extract_function_calls
         sym_dicts = [{'name': n['label'], 'kind': 'function'} for n in func_nodes]
@@ -295,24 +310,7 @@ def build_repo_graph(symbols: list[dict[str, Any]], diagnostics: list[dict] = No
                     'type': 'CALLS',
                 })
 
-    # ------------------------------------------------------------------
-    # Filter out cross-language REFERENCES edges (e.g. C symbol matching
-    # a Python symbol by name — these are coincidental, not real deps).
-    # ------------------------------------------------------------------
-    node_index = {n['id']: n for n in nodes}
-    filtered_edges = []
-    for edge in edges:
-        if edge['type'] == 'REFERENCES':
-            source_node = node_index.get(edge['source'])
-            target_node = node_index.get(edge['target'])
-            if source_node and target_node:
-                source_lang = get_language(source_node.get('file_path', ''))
-                target_lang = get_language(target_node.get('file_path', ''))
-                if source_lang != target_lang:
-                    continue
-        filtered_edges.append(edge)
-
-    return {"nodes": nodes, "edges": filtered_edges}
+    return {"nodes": nodes, "edges": edges}
 
 
 def build_graph_networkx(symbols: list[dict[str, Any]], diagnostics: list[dict] = None) -> "Optional[Any]":
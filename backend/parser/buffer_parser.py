@@ -2,24 +2,22 @@
 Parse unsaved buffer content and extract symbols/references for live analysis.
 """
 from __future__ import annotations
-from pathlib import Path
 from typing import Optional
 
 from .symbol_extractor import (
     Symbol,
     Reference,
-    extract_symbols_from_source,
-    extract_references_from_source,
+    IncrementalExtractor,
+    language_for_path,
 )
 
+# Buffers are re-sent on every edit; keep the last tree of recently edited files
+# so each request re-parses only the changed region
+_buffer_trees = IncrementalExtractor(max_entries=16)
+
 
 def get_language_from_path(file_path: str) -> Optional[str]:
-    ext = Path(file_path).suffix.lower()
-    if ext == ".py":
-        return "python"
-    if ext in (".c", ".h"):
-        return "c"
-    return None
+    return language_for_path(file_path)
 
 
 def parse_unsaved_buffer(
@@ -32,6 +30,4 @@ def parse_unsaved_buffer(
     if language is None:
         return [], []
     source = buffer_content.encode("utf-8")
-    symbols = extract_symbols_from_source(source, file_path, language)
-    refs = extract_references_from_source(source, file_path, language)
-    return symbols, refs
+    return _buffer_trees.extract(file_path, source, language)
@@ -3,11 +3,22 @@ Recursively scan repository and extract symbols into a symbol table.
 Persists to repo_symbols.json.
 """
 from __future__ import annotations
+import hashlib
 import json
+import os
+import pickle
+import sys
+import tempfile
 from pathlib import Path
 from typing import Optional
 
-from .symbol_extractor import Symbol, extract_symbols_from_source
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+from .symbol_extractor import extract_symbols_batch
 
 
 # Default ignore patterns
@@ -30,36 +41,135 @@ def should_ignore(path: Path, base: Path) -> bool:
     return False
 
 
-def build_repo_symbol_table(repo_path: str | Path, output_json_path: Optional[str | Path] = None) -> list[dict]:
-    import logging
-    repo_path = Path(repo_path).resolve()
-    if not repo_path.is_dir():
-        return []
-
-    symbols: list[Symbol] = []
-    files_scanned = 0
+def iter_repo_files(repo_path: Path):
+    """Yield every supported, non-ignored source file under repo_path."""
     for file_path in repo_path.rglob("*"):
         if not file_path.is_file():
             continue
         if should_ignore(file_path, repo_path):
             continue
+        yield file_path
+
+
+# Bump when the symbol dict layout or the extractor's output changes, so both the
+# per-file pickle cache and a persisted repo_symbols.json from older code are ignored
+SYMBOL_CACHE_VERSION = 2
+
+
+def repo_source_stamp(repo_path: str | Path) -> dict:
+    """Staleness stamp for a repo (stat only, no reads): a digest of every source
+    file's (relative path, mtime_ns, size), so edits, additions, deletions and
+    renames all change it, plus SYMBOL_CACHE_VERSION."""
+    repo_path = Path(repo_path).resolve()
+    entries = []
+    for file_path in iter_repo_files(repo_path):
+        try:
+            st = file_path.stat()
+        except OSError:
+            continue
+        entries.append((file_path.relative_to(repo_path).as_posix(), st.st_mtime_ns, st.st_size))
+    entries.sort()
+    digest = hashlib.sha1()
+    for rel, mtime_ns, size in entries:
+        digest.update(f"{rel}\0{mtime_ns}\0{size}\n".encode("utf-8", "surrogateescape"))
+    return {"version": SYMBOL_CACHE_VERSION, "file_count": len(entries), "digest": digest.hexdigest()}
+
+
+# (absolute path, st_mtime_ns, st_size) -> symbol dicts extracted from that file
+FileKey = tuple[str, int, int]
+
+
+def _load_symbol_cache(cache_path: Path) -> dict[FileKey, list[dict]]:
+    try:
+        with open(cache_path, "rb") as f:
+            payload = pickle.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).warning("Ignoring unreadable symbol cache %s: %s", cache_path, e)
+        return {}
+    if not isinstance(payload, dict) or payload.get("v") != SYMBOL_CACHE_VERSION:
+        return {}
+    return payload.get("files", {})
+
+
+def _save_symbol_cache(cache_path: Path, entries: dict[FileKey, list[dict]]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp name per call, so concurrent builds never write into the same file
+    tmp: Optional[Path] = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=cache_path.parent, prefix=cache_path.name + ".",
+                                         suffix=".tmp", delete=False) as f:
+            tmp = Path(f.name)
+            pickle.dump({"v": SYMBOL_CACHE_VERSION, "files": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except BaseException:
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+        raise
+
+
+def build_repo_symbol_table(repo_path: str | Path, output_json_path: Optional[str | Path] = None,
+                            cache_path: Optional[str | Path] = None) -> list[dict]:
+    """Extract symbols for every supported file under repo_path.
+
+    With cache_path, per-file results are memoized on (path, mtime_ns, size) so
+    only files that changed since the previous scan are read and re-parsed."""
+    import logging
+    repo_path = Path(repo_path).resolve()
+    if not repo_path.is_dir():
+        return []
+
+    cache = _load_symbol_cache(Path(cache_path)) if cache_path is not None else {}
+    order: list[tuple[str, Optional[FileKey]]] = []
+    by_file: dict[str, list[dict]] = {}
+    files: list[tuple[bytes, str]] = []
+    for file_path in iter_repo_files(repo_path):
+        rel = str(file_path.relative_to(repo_path))
+        key = None
+        if cache_path is not None:
+            try:
+                st = file_path.stat()
+            except OSError:
+                st = None
+            if st is not None:
+                key = (str(file_path), st.st_mtime_ns, st.st_size)
+                cached = cache.get(key)
+                if cached is not None:
+                    # Keyed by absolute path, but file_path is relative to whichever root was
+                    # scanned when the entry was stored (one cache serves every repo)
+                    if cached and cached[0].get("file_path") != rel:
+                        shared_rel = sys.intern(rel)
+                        cached = [{**d, "file_path": shared_rel} for d in cached]
+                    order.append((rel, key))
+                    by_file[rel] = cached
+                    continue
         try:
             source = file_path.read_bytes()
         except Exception as e:
             logging.getLogger(__name__).warning("Could not read %s: %s", file_path, e)
             continue
-        files_scanned += 1
-        rel_path = str(file_path.relative_to(repo_path))
-        extracted = extract_symbols_from_source(source, rel_path)
-        for s in extracted:
-            s.file_path = rel_path
-            symbols.append(s)
-
-    logging.getLogger(__name__).info("Scanned %d supported files, got %d symbols", files_scanned, len(symbols))
-    data = [s.to_dict() for s in symbols]
+        order.append((rel, key))
+        files.append((source, rel))
+
+    # Parsing is CPU-bound, so large repos are spread across processes
+    by_file.update(extract_symbols_batch(files))
+    data = [d for rel, _ in order for d in by_file[rel]]
+    logging.getLogger(__name__).info(
+        "Scanned %d supported files (%d re-parsed), got %d symbols", len(order), len(files), len(data))
+    if cache_path is not None:
+        # Only files seen in this scan are kept, so deleted files drop out of the cache
+        try:
+            _save_symbol_cache(Path(cache_path), {key: by_file[rel] for rel, key in order if key is not None})
+        except OSError as e:
+            logging.getLogger(__name__).warning("Could not write symbol cache %s: %s", cache_path, e)
     if output_json_path is not None:
         out = Path(output_json_path)
         out.parent.mkdir(parents=True, exist_ok=True)
-        with open(out, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        if HAS_ORJSON:
+            out.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
     return data
@@ -4,22 +4,34 @@ AST symbol extraction using Tree-sitter.
 Extracts variables, functions, arrays, types with metadata (name, type, file, line, scope).
 """
 from __future__ import annotations
+import ast
+import functools
+import operator
+import os
 import re
-from dataclasses import dataclass, field
-from pathlib import Path
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
 from typing import Any, Optional
 
 try:
     import tree_sitter
-    from tree_sitter import Language, Parser, Node
+    from tree_sitter import Language, Parser, Node, Query
     HAS_TREE_SITTER = True
 except ImportError:
     HAS_TREE_SITTER = False
     tree_sitter = None
-    Language = Parser = Node = None
+    Language = Parser = Node = Query = None
+
+try:
+    # tree-sitter >= 0.25 runs queries through a cursor; older bindings expose Query.matches
+    from tree_sitter import QueryCursor
+except ImportError:
+    QueryCursor = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Symbol:
     name: str
     kind: str  # variable, function, array, class, struct
@@ -28,32 +40,34 @@ class Symbol:
     line: int = 0
     scope: str = ""
     array_size: Optional[int] = None
-    params: list[dict[str, Any]] = field(default_factory=list)
-    references: list[dict[str, Any]] = field(default_factory=list)
+    params: Optional[list[dict[str, Any]]] = None  # None == no params; to_dict emits []
+    references: Optional[list[dict[str, Any]]] = None
     return_type: Optional[str] = None
     is_variadic: bool = False
     is_extern: bool = False
-    members: list[dict[str, Any]] = field(default_factory=list)  # struct members [{name, type}]
+    members: Optional[list[dict[str, Any]]] = None  # struct members [{name, type}]
 
     def to_dict(self) -> dict:
-        return {
-            "name": self.name,
-            "kind": self.kind,
-            "type": self.type,
-            "file_path": self.file_path,
-            "line": self.line,
-            "scope": self.scope,
-            "array_size": self.array_size,
-            "params": self.params,
-            "references": self.references,
-            "return_type": self.return_type,
-            "is_variadic": self.is_variadic,
-            "is_extern": self.is_extern,
-            "members": self.members,
-        }
-
-
-@dataclass
+        return _symbol_row_to_dict(_symbol_values(self))
+
+
+# to_dict runs once per symbol when the repo table is serialized; a C-level
+# attrgetter over the field names beats building the dict literal attribute by attribute.
+_SYMBOL_FIELDS: tuple[str, ...] = tuple(f.name for f in fields(Symbol))
+_SYMBOL_LIST_FIELDS = ("params", "references", "members")
+_symbol_values = operator.attrgetter(*_SYMBOL_FIELDS)
+
+
+def _symbol_row_to_dict(row: tuple) -> dict:
+    """Build the to_dict() form from a row of field values in _SYMBOL_FIELDS order."""
+    d = dict(zip(_SYMBOL_FIELDS, row))
+    for key in _SYMBOL_LIST_FIELDS:
+        if d[key] is None:
+            d[key] = []
+    return d
+
+
+@dataclass(slots=True)
 class Reference:
     name: str
     kind: str  # call, read, array_access, array_write, import, return_value, format_call, assignment, member_access
@@ -109,176 +123,373 @@ def _wrap_language(lang) -> Optional[Any]:
         return None
 
 
+@functools.lru_cache(maxsize=4)
+def _get_wrapped_language(lang_name: str) -> Optional[Any]:
+    """Resolve and wrap the tree-sitter Language once per language name."""
+    return _wrap_language(_get_language(lang_name))
+
+
+@functools.lru_cache(maxsize=None)
+def _kind_id(lang_name: str, node_type: str) -> Optional[int]:
+    """Integer id of a named node type; node.kind_id compares without building the
+    node.type string the binding allocates on every access."""
+    lang = _get_wrapped_language(lang_name)
+    return lang.id_for_node_kind(node_type, True) if lang is not None else None
+
+
+_KIND_ID_TABLES: dict[tuple[str, int], dict[int, Any]] = {}
+
+
+def _by_kind_id(lang_name: str, table: dict[str, Any]) -> dict[int, Any]:
+    """The node-type keyed table re-keyed by kind id (built once per language)."""
+    key = (lang_name, id(table))
+    by_id = _KIND_ID_TABLES.get(key)
+    if by_id is None:
+        by_id = {}
+        for node_type, value in table.items():
+            kind = _kind_id(lang_name, node_type)
+            if kind is not None:
+                by_id[kind] = value
+        _KIND_ID_TABLES[key] = by_id
+    return by_id
+
+
+# Parsers are not safe to share between threads (the server runs sync endpoints in
+# a thread pool), so each thread keeps one reusable Parser per language.
+_thread_parsers = threading.local()
+
+
 def _get_parser(lang_name: str) -> Optional[Parser]:
     if not HAS_TREE_SITTER:
         return None
-    lang = _get_language(lang_name)
-    lang = _wrap_language(lang)
-    if lang is None:
-        return None
-    parser = Parser(lang)
+    parsers = getattr(_thread_parsers, "by_lang", None)
+    if parsers is None:
+        parsers = _thread_parsers.by_lang = {}
+    parser = parsers.get(lang_name)
+    if parser is None:
+        lang = _get_wrapped_language(lang_name)
+        if lang is None:
+            return None
+        parser = parsers[lang_name] = Parser(lang)
     return parser
 
 
+# Node types each extractor cares about. Matching happens in C inside tree-sitter,
+# so Python only ever sees the nodes named here instead of recursing over every token.
+_QUERY_SOURCES: dict[tuple[str, str], str] = {
+    ("python", "symbols"): """
+        (function_definition) @function
+        (class_definition) @class
+        (assignment) @assignment
+    """,
+    ("c", "symbols"): """
+        (function_definition) @function
+        (declaration) @declaration
+        (struct_specifier) @struct
+    """,
+    ("c", "array_sizes"): """
+        (array_declarator declarator: (identifier) @name size: (number_literal) @size)
+    """,
+    ("python", "references"): """
+        (call) @call
+        (subscript) @subscript
+        (identifier) @identifier
+        (call (identifier) @identifier.skip)
+        (function_definition (identifier) @identifier.skip)
+        (parameters (identifier) @identifier.skip)
+        (attribute (identifier) @identifier.skip)
+        (import_statement) @import
+        (import_from_statement) @import_from
+        (function_definition) @function
+        (return_statement) @return
+        (assignment) @assignment
+    """,
+    ("python", "imports"): """
+        (import_statement name: (_) @module)
+        (import_from_statement module_name: (_) @module)
+        (future_import_statement) @future
+    """,
+    ("c", "includes"): """
+        (preproc_include path: (_) @path)
+    """,
+    ("c", "references"): """
+        (call_expression) @call
+        (subscript_expression) @subscript
+        (assignment_expression) @assignment
+        (field_expression) @field
+    """,
+}
+_QUERIES: dict[tuple[str, str], Any] = {}
+
+# C regex fallback: identifier[number], and the ';' that marks it as a declarator size
+_C_ARRAY_SUBSCRIPT_RE = re.compile(rb"([a-zA-Z_][a-zA-Z0-9_]*)\s*\[\s*(\d+)\s*\]")
+_C_ARRAY_DECL_TERMINATOR_RE = re.compile(rb"[ \t\r\n]*;")
+# C comments and string/char literals in one pass; unterminated ones run to end of file
+_C_COMMENT_OR_LITERAL_RE = re.compile(
+    rb"//[^\n]*"
+    rb"|/\*.*?(?:\*/|\Z)"
+    rb'|"(?:[^"\\]|\\.)*(?:"|\\?\Z)'
+    rb"|'(?:[^'\\]|\\.)*(?:'|\\?\Z)",
+    re.DOTALL,
+)
+# printf/scanf conversion specifiers (a literal "%%" is not one)
+_FMT_SPEC_RE = re.compile(rb"%(?!%)[diouxXeEfFgGaAcspnl*]")
+
+
+def _get_query(lang_name: str, purpose: str) -> Optional[Query]:
+    """Return the compiled query for (language, purpose), compiling it on first use."""
+    key = (lang_name, purpose)
+    query = _QUERIES.get(key)
+    if query is None:
+        lang = _get_wrapped_language(lang_name)
+        if lang is None:
+            return None
+        query = Query(lang, _QUERY_SOURCES[key])
+        _QUERIES[key] = query
+    return query
+
+
+def _query_captures(query: Query, root: Node) -> dict[str, list[Node]]:
+    """Run query over root and return {capture_name: [nodes]}."""
+    if QueryCursor is not None:
+        return QueryCursor(query).captures(root)
+    return query.captures(root)
+
+
+def _query_matches(query: Query, root: Node) -> list[tuple[int, dict[str, list[Node]]]]:
+    """Run query over root and return [(pattern_index, {capture_name: [nodes]})]."""
+    if QueryCursor is not None:
+        return QueryCursor(query).matches(root)
+    return query.matches(root)
+
+
+def _in_document_order(captures: dict[str, list[Node]]) -> list[tuple[str, Node]]:
+    """Flatten captures into (capture_name, node) pairs in pre-order, i.e. the
+    order a recursive walk would have visited them (parents first)."""
+    ordered = [(name, n) for name, nodes in captures.items() for n in nodes]
+    ordered.sort(key=lambda item: (item[1].start_byte, -item[1].end_byte))
+    return ordered
+
+
+def _captures_in_order(query: Query, root: Node) -> list[tuple[str, Node]]:
+    return _in_document_order(_query_captures(query, root))
+
+
 def _source_at(node: Node, source: bytes) -> str:
     return source[node.start_byte:node.end_byte].decode("utf-8", errors="replace")
 
 
-def _line_of(node: Node, source: bytes) -> int:
-    return source[:node.start_byte].count(b"\n") + 1
+def _identifier_at(node: Node, source: bytes, cache: dict[tuple[int, int], str]) -> str:
+    """Return the stripped text of an identifier-like node (names, type keywords,
+    index literals), interned and cached by byte range so each range is decoded
+    once per parse and shared between records."""
+    key = (node.start_byte, node.end_byte)
+    text = cache.get(key)
+    if text is None:
+        text = sys.intern(source[node.start_byte:node.end_byte].decode("utf-8", errors="replace").strip())
+        cache[key] = text
+    return text
 
 
-def _infer_c_expr_type(node: Node, source: bytes) -> Optional[str]:
-    """Infer C expression type for array write RHS: number_literal -> int, etc."""
-    if not node:
-        return None
-    if node.type == "number_literal":
-        txt = _source_at(node, source)
-        if "." in txt or "e" in txt.lower() or "f" in txt.lower():
-            return "float"
-        return "int"
-    if node.type in ("char_literal", "string_literal"):
-        return "char"
-    if node.type == "identifier":
-        return None  # caller looks up from symbols
-    # binary_expression, conditional_expression, unary_expression, etc. – recurse
-    for c in node.children:
-        t = _infer_c_expr_type(c, source)
-        if t:
-            return t
-    return "int"
+def _first_child_of_type(node: Node, node_type: str) -> Optional[Node]:
+    """Return the first direct child of node with the given type, or None."""
+    for child in node.children:
+        if child.type == node_type:
+            return child
+    return None
+
+
+def _line_of(node: Node) -> int:
+    # tree-sitter already tracks rows while parsing; no need to rescan the source
+    return node.start_point[0] + 1
 
 
-def _get_python_type_annotation(node: Node, source: bytes) -> Optional[str]:
-    """Extract type string from a tree-sitter annotation node."""
+# Leaf node types whose C type is fixed; number_literal needs the literal text.
+_C_LITERAL_TYPES: dict[str, Optional[str]] = {
+    "char_literal": "char",
+    "string_literal": "char",
+    "identifier": None,  # caller looks up from symbols
+}
+
+
+def _infer_c_expr_type(node: Node, source: bytes, memo: dict[int, Optional[str]]) -> Optional[str]:
+    """Infer C expression type for array write RHS: number_literal -> int, etc.
+    memo caches results by node id for the lifetime of one parsed tree.
+
+    A compound expression takes the type of its first child that is not an
+    identifier (identifiers are resolved by the caller), or int if there is none,
+    so this follows a single path down the tree instead of recursing."""
+    if not node:
+        return None
+    literal_types = _by_kind_id("c", _C_LITERAL_TYPES)
+    number_kind = _kind_id("c", "number_literal")
+    identifier_kind = _kind_id("c", "identifier")
+    path: list[Node] = []
+    while True:
+        if node.id in memo:
+            result = memo[node.id]
+            break
+        kind = node.kind_id
+        if kind in literal_types:
+            result = literal_types[kind]
+            break
+        if kind == number_kind:
+            txt = _source_at(node, source).lower()
+            result = "float" if "." in txt or "e" in txt or "f" in txt else "int"
+            break
+        # binary_expression, conditional_expression, unary_expression, etc. – descend
+        path.append(node)
+        node = next((c for c in node.children if c.kind_id != identifier_kind), None)
+        if node is None:
+            result = "int"
+            break
+    if node is not None:
+        memo[node.id] = result
+    for n in path:
+        memo[n.id] = result
+    return result
+
+
+def _get_python_type_annotation(node: Node, source: bytes,
+                                cache: Optional[dict[tuple[int, int], str]] = None) -> Optional[str]:
+    """Extract type string from a tree-sitter annotation node. With the per-parse
+    text cache, an annotation read repeatedly (e.g. a return type looked up for
+    every return statement) is decoded once."""
     if node is None:
         return None
-    text = _source_at(node, source).strip()
+    text = _identifier_at(node, source, cache) if cache is not None else _source_at(node, source).strip()
     # Strip leading ': ' or '-> ' that tree-sitter may include
     if text.startswith("->"):
         text = text[2:].strip()
     if text.startswith(":"):
         text = text[1:].strip()
-    return text if text else None
+    return sys.intern(text) if text else None
+
+
+# Python literal node type -> inferred type name
+_PY_LITERAL_TYPES: dict[str, str] = {
+    "list": "list",
+    "tuple": "tuple",
+    "integer": "int",
+    "float": "float",
+    "string": "str",
+    "true": "bool",
+    "false": "bool",
+    "dictionary": "dict",
+}
 
 
 def _infer_type_from_rhs(node: Node) -> Optional[str]:
     """Infer Python type from a right-hand-side literal node type."""
-    _TYPE_MAP = {
-        "list": "list",
-        "tuple": "tuple",
-        "integer": "int",
-        "float": "float",
-        "string": "str",
-        "true": "bool",
-        "false": "bool",
-        "dictionary": "dict",
-    }
-    return _TYPE_MAP.get(node.type)
+    return _by_kind_id("python", _PY_LITERAL_TYPES).get(node.kind_id)
 
 
 def _count_elements(node: Node) -> int:
-    """Count element children of a list/tuple node (skip brackets and commas)."""
-    skip = {"(", ")", "[", "]", ","}
-    return sum(1 for c in node.children if c.type not in skip)
+    """Count element children of a list/tuple node. Brackets and commas are
+    anonymous nodes, so the named-child count is exactly the element count."""
+    return node.named_child_count
+
 
+# Python parameter node type -> (has_default, annotated, splat), where splat is
+# (prefix, fallback name) for *args / **kwargs and None for named parameters
+_PY_PARAM_SHAPES: dict[str, tuple[bool, bool, Optional[tuple[str, str]]]] = {
+    "identifier": (False, False, None),
+    "typed_parameter": (False, True, None),
+    "default_parameter": (True, False, None),
+    "typed_default_parameter": (True, True, None),
+    "list_splat_pattern": (False, False, ("*", "args")),
+    "dictionary_splat_pattern": (False, False, ("**", "kwargs")),
+}
 
-def _extract_python_symbols(source: bytes, file_path: str) -> list[Symbol]:
+
+def _extract_python_symbols(source: bytes, file_path: str, tree: Optional[Any] = None) -> list[Symbol]:
     symbols: list[Symbol] = []
     parser = _get_parser("python")
     if parser is None:
+        # No tree-sitter-python: fall back to the stdlib parser
+        return _extract_python_symbols_ast(source, file_path)
+    query = _get_query("python", "symbols")
+    if query is None:
         return symbols
-    tree = parser.parse(source)
+    if tree is None:
+        tree = parser.parse(source)
     if tree.root_node is None:
         return symbols
 
-    def walk(node: Node, scope: str):
-        if node.type == "function_definition":
+    ids: dict[tuple[int, int], str] = {}
+    # Enclosing function/class scopes as (end_byte, dotted_scope); captures arrive in
+    # pre-order, so anything ending at or before the current node has been left.
+    scope_stack: list[tuple[int, str]] = []
+    for capture, node in _captures_in_order(query, tree.root_node):
+        while scope_stack and scope_stack[-1][0] <= node.start_byte:
+            scope_stack.pop()
+        scope = scope_stack[-1][1] if scope_stack else ""
+
+        if capture == "function":
             name_node = node.child_by_field_name("name")
             if name_node:
-                name = _source_at(name_node, source).strip()
+                name = _identifier_at(name_node, source, ids)
                 params_node = node.child_by_field_name("parameters")
                 params = []
                 is_variadic = False
                 if params_node:
+                    param_shapes = _by_kind_id("python", _PY_PARAM_SHAPES)
+                    identifier_kind = _kind_id("python", "identifier")
                     for c in params_node.children:
-                        pname = _source_at(c, source).strip()
-                        if c.type == "identifier":
-                            if pname in ("self", "cls"):
-                                continue
-                            params.append({"name": pname, "type": None, "has_default": False})
-                        elif c.type == "typed_parameter":
-                            id_node = c.child_by_field_name("name") or next((sc for sc in c.children if sc.type == "identifier"), None)
-                            ptype_node = c.child_by_field_name("type")
-                            id_name = _source_at(id_node, source).strip() if id_node else pname
-                            if id_name in ("self", "cls"):
-                                continue
-                            ptype = _get_python_type_annotation(ptype_node, source) if ptype_node else None
-                            params.append({"name": id_name, "type": ptype, "has_default": False})
-                        elif c.type == "default_parameter":
-                            id_node = c.child_by_field_name("name") or next((sc for sc in c.children if sc.type == "identifier"), None)
-                            id_name = _source_at(id_node, source).strip() if id_node else pname
-                            if id_name in ("self", "cls"):
-                                continue
-                            params.append({"name": id_name, "type": None, "has_default": True})
-                        elif c.type == "typed_default_parameter":
-                            id_node = c.child_by_field_name("name") or next((sc for sc in c.children if sc.type == "identifier"), None)
-                            ptype_node = c.child_by_field_name("type")
-                            id_name = _source_at(id_node, source).strip() if id_node else pname
-                            if id_name in ("self", "cls"):
-                                continue
-                            ptype = _get_python_type_annotation(ptype_node, source) if ptype_node else None
-                            params.append({"name": id_name, "type": ptype, "has_default": True})
-                        elif c.type == "list_splat_pattern":
-                            is_variadic = True
-                            id_node = next((sc for sc in c.children if sc.type == "identifier"), None)
-                            id_name = _source_at(id_node, source).strip() if id_node else "args"
-                            params.append({"name": f"*{id_name}", "type": None, "has_default": False})
-                        elif c.type == "dictionary_splat_pattern":
+                        shape = param_shapes.get(c.kind_id)
+                        if shape is None:
+                            continue  # punctuation, '/', '*' separators
+                        has_default, annotated, splat = shape
+                        if splat:
                             is_variadic = True
-                            id_node = next((sc for sc in c.children if sc.type == "identifier"), None)
-                            id_name = _source_at(id_node, source).strip() if id_node else "kwargs"
-                            params.append({"name": f"**{id_name}", "type": None, "has_default": False})
+                            id_node = _first_child_of_type(c, "identifier")
+                            id_name = _identifier_at(id_node, source, ids) if id_node else splat[1]
+                            params.append({"name": f"{splat[0]}{id_name}", "type": None, "has_default": False})
+                            continue
+                        if c.kind_id == identifier_kind:
+                            id_node = c
+                        else:
+                            id_node = c.child_by_field_name("name") or _first_child_of_type(c, "identifier") or c
+                        id_name = _identifier_at(id_node, source, ids)
+                        if id_name in ("self", "cls"):
+                            continue
+                        ptype_node = c.child_by_field_name("type") if annotated else None
+                        ptype = _get_python_type_annotation(ptype_node, source, ids) if ptype_node else None
+                        params.append({"name": id_name, "type": ptype, "has_default": has_default})
 
                 # Extract return type annotation
                 ret_type_node = node.child_by_field_name("return_type")
-                ret_type = _get_python_type_annotation(ret_type_node, source) if ret_type_node else None
+                ret_type = _get_python_type_annotation(ret_type_node, source, ids) if ret_type_node else None
 
                 symbols.append(Symbol(
                     name=name, kind="function", type=ret_type,
-                    file_path=file_path, line=_line_of(node, source), scope=scope,
+                    file_path=file_path, line=_line_of(node), scope=scope,
                     params=params, return_type=ret_type, is_variadic=is_variadic,
                 ))
-                inner_scope = f"{scope}.{name}" if scope else name
-                for c in node.children:
-                    walk(c, inner_scope)
-            return
+                scope_stack.append((node.end_byte, sys.intern(f"{scope}.{name}") if scope else name))
 
-        if node.type == "class_definition":
+        elif capture == "class":
             name_node = node.child_by_field_name("name")
             if name_node:
-                name = _source_at(name_node, source).strip()
+                name = _identifier_at(name_node, source, ids)
                 symbols.append(Symbol(
                     name=name, kind="class", type=None,
-                    file_path=file_path, line=_line_of(node, source), scope=scope
+                    file_path=file_path, line=_line_of(node), scope=scope
                 ))
-                inner_scope = f"{scope}.{name}" if scope else name
-                # Walk children — assignments (including annotated ones like
-                # dataclass fields) are handled by the assignment branch below.
-                for c in node.children:
-                    walk(c, inner_scope)
-            return
-
-        if node.type == "assignment":
+                # Assignments in the body (including annotated ones like dataclass
+                # fields) are captured separately and pick this scope up.
+                scope_stack.append((node.end_byte, sys.intern(f"{scope}.{name}") if scope else name))
+
+        elif capture == "assignment":
             # Get the RHS value node
             rhs_node = node.child_by_field_name("right") or (node.children[-1] if len(node.children) >= 3 else None)
             # Get the type annotation node (for annotated assignments like `x: int = 5`)
             type_node = node.child_by_field_name("type")
-            explicit_type = _get_python_type_annotation(type_node, source) if type_node else None
+            explicit_type = _get_python_type_annotation(type_node, source, ids) if type_node else None
 
             for c in node.children:
                 if c.type == "identifier":
-                    name = _source_at(c, source).strip()
+                    name = _identifier_at(c, source, ids)
                     if name and not name.startswith("_"):
                         inferred_type = explicit_type
                         array_size = None
@@ -290,44 +501,158 @@ def _extract_python_symbols(source: bytes, file_path: str) -> list[Symbol]:
                             kind = "array"
                         symbols.append(Symbol(
                             name=name, kind=kind, type=inferred_type,
-                            file_path=file_path, line=_line_of(node, source), scope=scope,
+                            file_path=file_path, line=_line_of(node), scope=scope,
                             array_size=array_size,
                         ))
                     break
                 if c.type in ("tuple_pattern", "list_pattern"):
                     for sub in c.children:
                         if sub.type == "identifier":
-                            name = _source_at(sub, source).strip()
+                            name = _identifier_at(sub, source, ids)
                             if name and not name.startswith("_"):
                                 symbols.append(Symbol(
                                     name=name, kind="variable", type=None,
-                                    file_path=file_path, line=_line_of(node, source), scope=scope
+                                    file_path=file_path, line=_line_of(node), scope=scope
                                 ))
 
-        for c in node.children:
-            walk(c, scope)
-
-    walk(tree.root_node, "")
     return symbols
 
 
-def _extract_c_symbols(source: bytes, file_path: str) -> list[Symbol]:
+# ast literal node -> inferred type name (mirrors _PY_LITERAL_TYPES)
+_AST_LITERAL_TYPES: dict[type, str] = {
+    ast.List: "list",
+    ast.Tuple: "tuple",
+    ast.Dict: "dict",
+    ast.JoinedStr: "str",
+}
+_AST_CONSTANT_TYPES: dict[type, str] = {bool: "bool", int: "int", float: "float", str: "str", bytes: "str"}
+
+
+def _extract_python_symbols_ast(source: bytes, file_path: str) -> list[Symbol]:
+    """Python symbol extraction on the stdlib ast, for environments without
+    tree-sitter-python. Covers the same functions, classes and plain-name
+    assignment targets as the tree-sitter path; unlike it, a file with a syntax
+    error yields no symbols at all."""
+    try:
+        module = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    text = source.decode("utf-8", errors="replace")
+
+    def annotation(node: Optional[ast.AST]) -> Optional[str]:
+        if node is None:
+            return None
+        segment = ast.get_source_segment(text, node)
+        return sys.intern(segment.strip()) if segment and segment.strip() else None
+
+    def infer(node: Optional[ast.AST]) -> Optional[str]:
+        if isinstance(node, ast.Constant):
+            return _AST_CONSTANT_TYPES.get(type(node.value))
+        if isinstance(node, ast.Tuple) and not _ast_parenthesized(text, node):
+            return None  # bare `1, 2` is an expression list, not a tuple literal
+        return _AST_LITERAL_TYPES.get(type(node))
+
+    found: list[tuple[tuple[int, int], Symbol]] = []
+
+    def visit(node: ast.AST, scope: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            pos = (getattr(child, "lineno", 0), getattr(child, "col_offset", 0))
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                args = child.args
+                params: list[dict] = []
+                positional = args.posonlyargs + args.args
+                first_default = len(positional) - len(args.defaults)
+                for i, a in enumerate(positional):
+                    if a.arg not in ("self", "cls"):
+                        params.append({"name": a.arg, "type": annotation(a.annotation),
+                                       "has_default": i >= first_default})
+                if args.vararg:
+                    params.append({"name": f"*{args.vararg.arg}", "type": None, "has_default": False})
+                for a, default in zip(args.kwonlyargs, args.kw_defaults):
+                    params.append({"name": a.arg, "type": annotation(a.annotation),
+                                   "has_default": default is not None})
+                if args.kwarg:
+                    params.append({"name": f"**{args.kwarg.arg}", "type": None, "has_default": False})
+                ret_type = annotation(child.returns)
+                found.append((pos, Symbol(
+                    name=child.name, kind="function", type=ret_type,
+                    file_path=file_path, line=child.lineno, scope=scope,
+                    params=params, return_type=ret_type,
+                    is_variadic=args.vararg is not None or args.kwarg is not None,
+                )))
+                visit(child, sys.intern(f"{scope}.{child.name}") if scope else child.name)
+                continue
+            if isinstance(child, ast.ClassDef):
+                found.append((pos, Symbol(
+                    name=child.name, kind="class", type=None,
+                    file_path=file_path, line=child.lineno, scope=scope,
+                )))
+                visit(child, sys.intern(f"{scope}.{child.name}") if scope else child.name)
+                continue
+            if isinstance(child, (ast.Assign, ast.AnnAssign)):
+                targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+                explicit_type = annotation(child.annotation) if isinstance(child, ast.AnnAssign) else None
+                for i, target in enumerate(targets):
+                    # In `a = b = []` only the innermost target sees the literal
+                    rhs = child.value if i == len(targets) - 1 else None
+                    if isinstance(target, ast.Name):
+                        if target.id.startswith("_"):
+                            continue
+                        inferred_type = explicit_type or infer(rhs)
+                        array_size = None
+                        kind = "variable"
+                        if isinstance(rhs, ast.List) or (isinstance(rhs, ast.Tuple) and _ast_parenthesized(text, rhs)):
+                            array_size = len(rhs.elts)
+                            kind = "array"
+                        found.append((pos, Symbol(
+                            name=target.id, kind=kind, type=inferred_type,
+                            file_path=file_path, line=child.lineno, scope=scope,
+                            array_size=array_size,
+                        )))
+                    elif isinstance(target, (ast.Tuple, ast.List)) and _ast_parenthesized(text, target):
+                        for elt in target.elts:
+                            if isinstance(elt, ast.Name) and not elt.id.startswith("_"):
+                                found.append((pos, Symbol(
+                                    name=elt.id, kind="variable", type=None,
+                                    file_path=file_path, line=child.lineno, scope=scope,
+                                )))
+            visit(child, scope)
+
+    visit(module, "")
+    # ast fields are not in source order (decorators follow the body); sort to match pre-order
+    found.sort(key=lambda item: item[0])
+    return [sym for _, sym in found]
+
+
+def _ast_parenthesized(text: str, node: ast.AST) -> bool:
+    """True for `(a, b)` / `[a, b]` written with brackets, False for a bare `a, b`."""
+    segment = ast.get_source_segment(text, node) or ""
+    return segment[:1] in ("(", "[")
+
+
+def _extract_c_symbols(source: bytes, file_path: str, tree: Optional[Any] = None) -> list[Symbol]:
     symbols: list[Symbol] = []
     parser = _get_parser("c")
     if parser is None:
         return symbols
-    tree = parser.parse(source)
+    query = _get_query("c", "symbols")
+    if query is None:
+        return symbols
+    if tree is None:
+        tree = parser.parse(source)
     if tree.root_node is None:
         return symbols
 
+    ids: dict[tuple[int, int], str] = {}
+
     def get_type_str(decl_node: Node) -> str:
         type_parts = []
         for c in decl_node.children:
             if c.type in ("primitive_type", "sized_type_specifier", "type_identifier", "struct_specifier"):
-                type_parts.append(_source_at(c, source).strip())
+                type_parts.append(_identifier_at(c, source, ids))
             if c.type == "pointer_declarator" and c.child_count:
                 type_parts.append("*")
-        return " ".join(type_parts) if type_parts else "int"
+        return sys.intern(" ".join(type_parts)) if type_parts else "int"
 
     def get_array_size(decl_node: Node) -> Optional[int]:
         declarator = decl_node.child_by_field_name("declarator")
@@ -336,42 +661,43 @@ def _extract_c_symbols(source: bytes, file_path: str) -> list[Symbol]:
         return get_array_size_from_declarator(declarator)
 
     def get_array_size_from_declarator(decl_node: Node) -> Optional[int]:
-        if decl_node.type == "array_declarator":
-            size_node = decl_node.child_by_field_name("size")
-            if size_node:
-                try:
-                    return int(_source_at(size_node, source).strip(), 0)
-                except ValueError:
-                    pass
-            for sub in decl_node.children:
-                if sub.type == "number_literal":
+        # Follow nested array_declarators (e.g. int m[2][3]) down to the first size
+        node: Optional[Node] = decl_node
+        while node is not None:
+            if node.type == "array_declarator":
+                size_node = node.child_by_field_name("size")
+                if size_node:
                     try:
-                        return int(_source_at(sub, source).strip(), 0)
+                        return int(_source_at(size_node, source).strip(), 0)
                     except ValueError:
-                        return None
-        for c in decl_node.children:
-            if c.type == "array_declarator":
-                return get_array_size_from_declarator(c)
+                        pass
+                for sub in node.children:
+                    if sub.type == "number_literal":
+                        try:
+                            return int(_source_at(sub, source).strip(), 0)
+                        except ValueError:
+                            return None
+            node = _first_child_of_type(node, "array_declarator")
         return None
 
     def _identifier_from_declarator(decl_node: Node, src: bytes) -> Optional[str]:
-        if decl_node.type == "identifier":
-            return _source_at(decl_node, src).strip()
-        for c in decl_node.children:
-            if c.type == "identifier":
-                return _source_at(c, src).strip()
-            sub = _identifier_from_declarator(c, src)
-            if sub:
-                return sub
+        # Pre-order search with an explicit stack (declarators nest arbitrarily deep)
+        stack = [decl_node]
+        while stack:
+            n = stack.pop()
+            if n.type == "identifier":
+                return _identifier_at(n, src, ids)
+            if n.child_count:  # '*', '[', number_literal, ... cannot hold the name
+                stack.extend(reversed(n.children))
         return None
 
-    def walk(node: Node):
-        if node.type == "function_definition":
+    for capture, node in _captures_in_order(query, tree.root_node):
+        if capture == "function":
             declarator = node.child_by_field_name("declarator")
             if declarator and declarator.type == "function_declarator":
                 id_node = declarator.child_by_field_name("declarator")
                 if id_node and id_node.type == "identifier":
-                    name = _source_at(id_node, source).strip()
+                    name = _identifier_at(id_node, source, ids)
                     params_node = declarator.child_by_field_name("parameters")
                     params = []
                     if params_node:
@@ -379,26 +705,26 @@ def _extract_c_symbols(source: bytes, file_path: str) -> list[Symbol]:
                             if c.type == "parameter_declaration":
                                 pdecl = c.child_by_field_name("declarator")
                                 if pdecl and pdecl.type == "identifier":
-                                    params.append({"name": _source_at(pdecl, source).strip(), "type": get_type_str(c)})
+                                    params.append({"name": _identifier_at(pdecl, source, ids), "type": get_type_str(c)})
                     symbols.append(Symbol(
                         name=name, kind="function", type=get_type_str(node),
-                        file_path=file_path, line=_line_of(node, source), scope="",
+                        file_path=file_path, line=_line_of(node), scope="",
                         params=params
                     ))
-        if node.type == "declaration":
+        elif capture == "declaration":
             type_str = get_type_str(node)
             is_extern = any(
-                c.type == "storage_class_specifier" and _source_at(c, source).strip() == "extern"
+                c.type == "storage_class_specifier" and _identifier_at(c, source, ids) == "extern"
                 for c in node.children
             )
             decl_list = node.child_by_field_name("declarator") or node.child_by_field_name("init_declarator_list")
             if decl_list:
                 # If declarator is directly an identifier (e.g. "struct Point p;"), handle it
                 if decl_list.type == "identifier":
-                    name = _source_at(decl_list, source).strip()
+                    name = _identifier_at(decl_list, source, ids)
                     symbols.append(Symbol(
                         name=name, kind="variable",
-                        type=type_str, file_path=file_path, line=_line_of(node, source),
+                        type=type_str, file_path=file_path, line=_line_of(node),
                         scope="", array_size=None, is_extern=is_extern,
                     ))
                 else:
@@ -410,20 +736,20 @@ def _extract_c_symbols(source: bytes, file_path: str) -> list[Symbol]:
                             if name:
                                 symbols.append(Symbol(
                                     name=name, kind="array" if size is not None else "variable",
-                                    type=type_str, file_path=file_path, line=_line_of(node, source),
+                                    type=type_str, file_path=file_path, line=_line_of(node),
                                     scope="", array_size=size, is_extern=is_extern,
                                 ))
                         elif c.type == "identifier":
-                            name = _source_at(c, source).strip()
+                            name = _identifier_at(c, source, ids)
                             symbols.append(Symbol(
                                 name=name, kind="variable",
-                                type=type_str, file_path=file_path, line=_line_of(node, source),
+                                type=type_str, file_path=file_path, line=_line_of(node),
                                 scope="", array_size=None, is_extern=is_extern,
                             ))
-        if node.type == "struct_specifier":
+        elif capture == "struct":
             name_node = node.child_by_field_name("name")
             if name_node:
-                name = _source_at(name_node, source).strip()
+                name = _identifier_at(name_node, source, ids)
                 # #19: Extract struct members from body (field_declaration_list)
                 members = []
                 body = node.child_by_field_name("body")
@@ -435,424 +761,618 @@ def _extract_c_symbols(source: bytes, file_path: str) -> list[Symbol]:
                             if field_declarator:
                                 # tree-sitter uses field_identifier for struct members
                                 if field_declarator.type == "field_identifier":
-                                    field_name = _source_at(field_declarator, source).strip()
+                                    field_name = _identifier_at(field_declarator, source, ids)
                                 else:
                                     field_name = _identifier_from_declarator(field_declarator, source)
                                 if field_name:
                                     members.append({"name": field_name, "type": field_type})
                 symbols.append(Symbol(
                     name=name, kind="struct", type="struct",
-                    file_path=file_path, line=_line_of(node, source), scope="",
+                    file_path=file_path, line=_line_of(node), scope="",
                     members=members,
                 ))
-        for c in node.children:
-            walk(c)
-
-    walk(tree.root_node)
 
-    # Set array_size from source line when tree didn't give it (e.g. "int arr[10];")
-    try:
-        lines = source.decode("utf-8", errors="replace").splitlines()
-    except Exception:
-        lines = []
-    for s in symbols:
-        if s.array_size is not None:
-            continue
-        idx = s.line - 1
-        if 0 <= idx < len(lines):
-            line = lines[idx]
-            m = re.search(r"\b" + re.escape(s.name) + r"\s*\[\s*(\d+)\s*\]", line)
-            if m:
-                try:
-                    s.array_size = int(m.group(1), 10)
-                    s.kind = "array"
-                except ValueError:
-                    pass
+    # Set array_size when the declaration loop didn't give it (e.g. "int arr[10];",
+    # whose declarator is a bare array_declarator rather than an init_declarator).
+    # No '[' in the file means no array declarators, so the second query is skipped.
+    if b"[" in source and any(s.array_size is None for s in symbols):
+        sizes: dict[tuple[str, int], int] = {}
+        for _, caps in _query_matches(_get_query("c", "array_sizes"), tree.root_node):
+            name_node = caps["name"][0]
+            try:
+                size = int(_source_at(caps["size"][0], source).strip(), 10)
+            except ValueError:
+                continue
+            sizes.setdefault((_identifier_at(name_node, source, ids), _line_of(name_node)), size)
+        for s in symbols:
+            if s.array_size is not None:
+                continue
+            size = sizes.get((s.name, s.line))
+            if size is not None:
+                s.array_size = size
+                s.kind = "array"
     return symbols
 
 
 def _get_comment_and_string_ranges_c(source: bytes) -> list[tuple[int, int]]:
     """Return (start_byte, end_byte) ranges for C comments and string literals.
     Used to skip regex matches that fall inside comments or strings."""
-    ranges: list[tuple[int, int]] = []
-    i = 0
-    n = len(source)
-    while i < n:
-        if i < n - 1 and source[i : i + 2] == b"//":
-            start = i
-            i += 2
-            while i < n and source[i : i + 1] != b"\n":
-                i += 1
-            ranges.append((start, i))
-            continue
-        if i < n - 1 and source[i : i + 2] == b"/*":
-            start = i
-            i += 2
-            while i < n - 1 and source[i : i + 2] != b"*/":
-                i += 1
-            i = min(i + 2, n)
-            ranges.append((start, i))
-            continue
-        if source[i : i + 1] in (b'"', b"'"):
-            quote = source[i : i + 1]
-            start = i
-            i += 1
-            while i < n:
-                if source[i : i + 1] == b"\\":
-                    i += 2
-                    continue
-                if source[i : i + 1] == quote:
-                    i += 1
-                    break
-                i += 1
-            ranges.append((start, i))
-            continue
-        i += 1
-    return ranges
-
-
-def _position_in_ranges(pos: int, ranges: list[tuple[int, int]]) -> bool:
-    """Return True if pos (byte offset) falls inside any range."""
-    for start, end in ranges:
-        if start <= pos < end:
-            return True
-    return False
+    return [m.span() for m in _C_COMMENT_OR_LITERAL_RE.finditer(source)]
 
 
 def _is_array_declarator_context_c(source: bytes, match_end: int) -> bool:
     """Return True if identifier[number] at match_end is in declaration context
     (array size in declarator), not an array access. E.g. 'extern int arr[10];'
     has [10] as size, not access."""
-    n = len(source)
-    i = match_end
-    while i < n and source[i : i + 1] in b" \t\n\r":
-        i += 1
-    if i < n and source[i : i + 1] == b";":
-        return True
-    return False
+    return _C_ARRAY_DECL_TERMINATOR_RE.match(source, match_end) is not None
+
+
+def _parse_root(code: str, language: str, tree: Optional[Any]) -> Optional[Node]:
+    if tree is None:
+        parser = _get_parser(language)
+        if parser is None:
+            return None
+        tree = parser.parse(code.encode("utf-8", errors="replace"))
+    return tree.root_node
 
 
-def extract_includes(code: str, file_path: str) -> list[dict]:
-    """Extract #include statements from C/C++ source code."""
+_INCLUDE_PATH_TYPES = frozenset({"string_literal", "system_lib_string"})
+
+
+def extract_includes(code: str, file_path: str, tree: Optional[Any] = None) -> list[dict]:
+    """Extract #include statements from C/C++ source code, read off the tree-sitter
+    tree (pass `tree` if the file is already parsed). Falls back to a regex scan
+    without tree-sitter, or when error recovery may have swallowed directives
+    (common in macro-heavy headers)."""
+    query = _get_query("c", "includes")
+    root = _parse_root(code, "c", tree) if query is not None else None
+    if root is None or root.has_error:
+        return [
+            {'type': 'include', 'file': m.group(1), 'line': code.count('\n', 0, m.start()) + 1}
+            for m in re.finditer(r'#include\s*[<"]([^>"]+)[>"]', code)
+        ]
     includes = []
-    for match in re.finditer(r'#include\s*[<"]([^>"]+)[>"]', code):
-        included_file = match.group(1)
-        includes.append({
-            'type': 'include',
-            'file': included_file,
-            'line': code[:match.start()].count('\n') + 1
-        })
+    for _, path_node in _captures_in_order(query, root):
+        # "file.h" / <file.h> only; a macro path (#include CONFIG_H) names no file
+        if path_node.type not in _INCLUDE_PATH_TYPES:
+            continue
+        included_file = path_node.text.decode("utf-8", errors="replace").strip()[1:-1]
+        if included_file:
+            includes.append({'type': 'include', 'file': included_file, 'line': _line_of(path_node)})
     return includes
 
 
-def extract_imports(code: str, file_path: str) -> list[dict]:
-    """Extract import statements from Python source code."""
+def extract_imports(code: str, file_path: str, tree: Optional[Any] = None) -> list[dict]:
+    """Extract import statements from Python source code: one entry per statement,
+    naming the imported module (the first one for 'import a, b')."""
+    query = _get_query("python", "imports")
+    root = _parse_root(code, "python", tree) if query is not None else None
+    if root is None or root.has_error:
+        imports = []
+        for match in re.finditer(r'(?:from\s+(\S+)\s+)?import\s+([^#\n]+)', code):
+            module = match.group(1) or match.group(2).split()[0]
+            module = module.strip().rstrip(';').strip()
+            if module:
+                imports.append({'type': 'import', 'module': module, 'line': code.count('\n', 0, match.start()) + 1})
+        return imports
     imports = []
-    for match in re.finditer(r'(?:from\s+(\S+)\s+)?import\s+([^#\n]+)', code):
-        module = match.group(1) or match.group(2).split()[0]
-        module = module.strip().rstrip(';').strip()
+    seen_statements: set[int] = set()
+    for capture, node in _captures_in_order(query, root):
+        if capture == "future":
+            imports.append({'type': 'import', 'module': '__future__', 'line': _line_of(node)})
+            continue
+        statement = node.parent
+        if statement.id in seen_statements:
+            continue
+        seen_statements.add(statement.id)
+        if node.type == "aliased_import":
+            node = node.child_by_field_name("name") or node
+        module = node.text.decode("utf-8", errors="replace")
         if module:
-            imports.append({
-                'type': 'import',
-                'module': module,
-                'line': code[:match.start()].count('\n') + 1
-            })
+            imports.append({'type': 'import', 'module': module, 'line': _line_of(statement)})
     return imports
 
 
 def extract_function_calls(code: str, symbols: list[dict]) -> list[dict]:
     """Find intra-file function calls in source code."""
-    calls = []
     function_names = [s['name'] for s in symbols if s.get('kind') == 'function']
-    for func_name in function_names:
-        pattern = rf'\b{re.escape(func_name)}\s*\('
-        for match in re.finditer(pattern, code):
-            line_num = code[:match.start()].count('\n') + 1
-            calls.append({
-                'function': func_name,
-                'line': line_num
-            })
-    return calls
-
-
-def extract_symbols_from_source(source: bytes, file_path: str, language: Optional[str] = None) -> list[Symbol]:
+    if not function_names:
+        return []
+    # One alternation over every name, scanned once; line numbers are counted
+    # incrementally since matches arrive in source order.
+    unique_names = dict.fromkeys(function_names)
+    pattern = re.compile(r'\b(' + '|'.join(map(re.escape, unique_names)) + r')\s*\(')
+    lines_by_name: dict[str, list[int]] = {name: [] for name in unique_names}
+    line_num, pos = 1, 0
+    for match in pattern.finditer(code):
+        line_num += code.count('\n', pos, match.start())
+        pos = match.start()
+        lines_by_name[match.group(1)].append(line_num)
+    # Grouped per name, in symbol order, as callers expect
+    return [{'function': name, 'line': line} for name in function_names for line in lines_by_name[name]]
+
+
+# Source file extension -> language name used throughout the parser/analyzers
+LANGUAGE_BY_EXTENSION: dict[str, str] = {".py": "python", ".c": "c", ".h": "c"}
+
+
+def language_for_path(file_path: str) -> Optional[str]:
+    """Return 'python' or 'c' from the file extension, or None if unsupported."""
+    return LANGUAGE_BY_EXTENSION.get(os.path.splitext(file_path)[1].lower())
+
+
+def extract_symbols_from_source(source: bytes, file_path: str, language: Optional[str] = None,
+                                tree: Optional[Any] = None) -> list[Symbol]:
+    """Extract symbols from source. Batch callers that already know the language
+    should pass it to skip extension detection; a pre-parsed tree skips the parse."""
     if language is None:
-        ext = Path(file_path).suffix.lower()
-        if ext == ".py":
-            language = "python"
-        elif ext in (".c", ".h"):
-            language = "c"
-        else:
-            return []
-    if language == "python":
-        return _extract_python_symbols(source, file_path)
-    if language == "c":
-        return _extract_c_symbols(source, file_path)
-    return []
+        language = language_for_path(file_path)
+    extractor = _SYMBOL_EXTRACTORS.get(language)
+    if extractor is None:
+        return []
+    return extractor(source, file_path, tree)
+
+
+_SYMBOL_EXTRACTORS = {"python": _extract_python_symbols, "c": _extract_c_symbols}
+
+# Below this many files the process pool startup costs more than it saves
+_BATCH_MIN_FILES = 32
+
+
+def _warm_worker_parsers() -> None:
+    """Pool initializer: build each worker's parsers once, up front."""
+    for lang_name in _SYMBOL_EXTRACTORS:
+        _get_parser(lang_name)
+
+
+# Fields drawn from a small, repeating domain. Unpickling (worker results) and JSON
+# loading (persisted tables) both produce fresh copies of these strings per symbol.
+_SHARED_STRING_FIELDS = ("kind", "type", "file_path", "scope", "return_type")
+
+
+def intern_symbol_strings(d: dict) -> dict:
+    """Re-intern a symbol dict's shared string fields in place so equal values share one object."""
+    for key in _SHARED_STRING_FIELDS:
+        value = d.get(key)
+        if value is not None:
+            d[key] = sys.intern(value)
+    return d
+
 
+def _shared_symbol_dict(row: tuple) -> dict:
+    return intern_symbol_strings(_symbol_row_to_dict(row))
 
-def extract_references_from_source(source: bytes, file_path: str, language: Optional[str] = None) -> list[Reference]:
+
+def _extract_symbol_rows(item: tuple[bytes, str]) -> list[tuple]:
+    # Workers ship plain field tuples: no per-symbol key strings to pickle
+    source, file_path = item
+    return [_symbol_values(s) for s in extract_symbols_from_source(source, file_path)]
+
+
+def extract_symbols_batch(files: list[tuple[bytes, str]], max_workers: Optional[int] = None) -> dict[str, list[dict]]:
+    """Extract symbols for many (source, file_path) pairs across worker processes.
+    Results are returned as Symbol.to_dict() dicts, keyed by file path in input order."""
+    if len(files) < _BATCH_MIN_FILES:
+        return {path: [s.to_dict() for s in extract_symbols_from_source(src, path)] for src, path in files}
+    from concurrent.futures import ProcessPoolExecutor
+    workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker_parsers) as pool:
+        results = pool.map(_extract_symbol_rows, files, chunksize=chunksize)
+        return {path: [_shared_symbol_dict(row) for row in rows] for (_, path), rows in zip(files, results)}
+
+
+class _RefContext:
+    """Per-parse state shared by the reference capture handlers."""
+    __slots__ = ("source", "refs", "ids", "c_type_memo", "non_reads", "has_format_calls", "functions")
+
+    def __init__(self, source: bytes, language: str, refs: list[Reference], non_reads: set[int]):
+        self.source = source
+        self.refs = refs
+        self.ids: dict[tuple[int, int], str] = {}
+        self.c_type_memo: dict[int, Optional[str]] = {}
+        self.non_reads = non_reads
+        # Every printf/scanf-family name contains one of these; a memchr-speed
+        # check lets files without them skip the format-string branch entirely
+        self.has_format_calls = language == "c" and (b"printf" in source or b"scanf" in source)
+        # Open Python functions as (end_byte, name, declared return type), innermost last
+        self.functions: list[tuple[int, str, Optional[str]]] = []
+
+
+def _index_value(idx: Node, ctx: _RefContext) -> Optional[int]:
+    try:
+        return int(_identifier_at(idx, ctx.source, ctx.ids), 0)
+    except ValueError:
+        return None
+
+
+def _c_subscript_parts(node: Node) -> tuple[Optional[Node], Optional[Node]]:
+    arr = node.child_by_field_name("argument")
+    idx = node.child_by_field_name("index")
+    # Some tree-sitter-c versions use different fields; try positional fallback (array, '[', index, ']').
+    if (not arr or not idx) and len(node.children) >= 4:
+        arr = node.children[0]
+        idx = node.children[2]
+    return arr, idx
+
+
+def _ref_python_call(node: Node, ctx: _RefContext) -> None:
+    fn = node.child_by_field_name("function")
+    if fn:
+        name = _identifier_at(fn, ctx.source, ctx.ids)
+        args = node.child_by_field_name("arguments")
+        arg_children = args.named_children if args else []
+        nargs = len(arg_children)
+        # #18: Infer argument types for type checking
+        inferred_arg_types: list[Optional[str]] = []
+        for ac in arg_children:
+            t = _infer_type_from_rhs(ac)
+            if t is None and ac.type == "identifier":
+                t = None  # checker will look up from symbols
+            inferred_arg_types.append(t)
+        ctx.refs.append(Reference(name=name, kind="call", line=_line_of(node),
+                                  arg_count=nargs, arg_types=inferred_arg_types if any(t is not None for t in inferred_arg_types) else None))
+
+
+# printf/scanf family -> position of the format string argument
+_FORMAT_ARG_INDEX: dict[str, int] = {
+    "printf": 0, "scanf": 0,
+    "fprintf": 1, "fscanf": 1, "sprintf": 1, "sscanf": 1,
+    "snprintf": 2,
+}
+
+
+def _ref_c_call(node: Node, ctx: _RefContext) -> None:
+    fn = node.child_by_field_name("function")
+    if fn and fn.type == "identifier":
+        source = ctx.source
+        name = _identifier_at(fn, source, ctx.ids)
+        args = node.child_by_field_name("arguments")
+        arg_children = args.named_children if args else []
+        nargs = len(arg_children)
+        ctx.refs.append(Reference(name=name, kind="call", line=_line_of(node), arg_count=nargs))
+        # #12: Format string detection for printf family
+        fmt_arg_idx = _FORMAT_ARG_INDEX.get(name) if ctx.has_format_calls else None
+        if fmt_arg_idx is not None and fmt_arg_idx < nargs:
+            fmt_node = arg_children[fmt_arg_idx]
+            if fmt_node.type == "string_literal":
+                # Body between the quote tokens (handles L"..." too); counted as
+                # bytes and decoded once, only for the Reference
+                body_start = fmt_node.children[0].end_byte
+                body_end = max(fmt_node.children[-1].start_byte, body_start)
+                num_specs = sum(1 for _ in _FMT_SPEC_RE.finditer(source, body_start, body_end))
+                fmt_str = source[body_start:body_end].decode("utf-8", errors="replace")
+                actual_fmt_args = nargs - fmt_arg_idx - 1
+                ctx.refs.append(Reference(
+                    name=name, kind="format_call",
+                    line=_line_of(node),
+                    arg_count=actual_fmt_args,
+                    format_specifiers=num_specs,
+                    format_string=fmt_str,
+                ))
+
+
+def _ref_python_subscript(node: Node, ctx: _RefContext) -> None:
+    obj = node.child_by_field_name("value")
+    idx = node.child_by_field_name("subscript") or node.child_by_field_name("index")
+    if obj and idx:
+        name = _identifier_at(obj, ctx.source, ctx.ids)
+        ctx.refs.append(Reference(name=name, kind="array_access", line=_line_of(node),
+                                  index_value=_index_value(idx, ctx)))
+
+
+def _ref_c_subscript(node: Node, ctx: _RefContext) -> None:
+    arr, idx = _c_subscript_parts(node)
+    if arr and idx:
+        name = _identifier_at(arr, ctx.source, ctx.ids)
+        ctx.refs.append(Reference(name=name, kind="array_access", line=_line_of(node),
+                                  index_value=_index_value(idx, ctx)))
+
+
+def _ref_python_identifier(node: Node, ctx: _RefContext) -> None:
+    if node.id in ctx.non_reads:
+        return
+    name = _identifier_at(node, ctx.source, ctx.ids)
+    if name and not name.startswith("_"):
+        ctx.refs.append(Reference(name=name, kind="read", line=_line_of(node)))
+
+
+def _ref_c_assignment(node: Node, ctx: _RefContext) -> None:
+    # C: arr[i] = expr – detect array write for type mismatch (e.g. assigning int to char[])
+    left = node.child_by_field_name("left")
+    right = node.child_by_field_name("right")
+    if left and left.type in ("subscript_expression", "subscript") and right:
+        arr_node, idx_node = _c_subscript_parts(left)
+        if arr_node and idx_node:
+            source, ids = ctx.source, ctx.ids
+            name = _identifier_at(arr_node, source, ids)
+            index_val = _index_value(idx_node, ctx)
+            rhs_type = _infer_c_expr_type(right, source, ctx.c_type_memo)
+            rhs_name = _identifier_at(right, source, ids) if right.type == "identifier" else None
+            ctx.refs.append(Reference(
+                name=name, kind="array_write", line=_line_of(node),
+                index_value=index_val, inferred_type=rhs_type, rhs_name=rhs_name,
+            ))
+
+
+def _imported_local_name(node: Node, ctx: _RefContext) -> Optional[str]:
+    alias_node = node.child_by_field_name("alias")
+    name_node = node.child_by_field_name("name")
+    local = alias_node if alias_node else name_node
+    return _identifier_at(local, ctx.source, ctx.ids) if local else None
+
+
+def _ref_python_import(node: Node, ctx: _RefContext) -> None:
+    # #14: Python import extraction
+    imported = []
+    for c in node.children:
+        if c.type == "dotted_name":
+            imported.append(_identifier_at(c, ctx.source, ctx.ids))
+        elif c.type == "aliased_import":
+            local = _imported_local_name(c, ctx)
+            if local:
+                imported.append(local)
+    if imported:
+        ctx.refs.append(Reference(
+            name="__import__", kind="import",
+            line=_line_of(node),
+            imported_names=imported,
+        ))
+
+
+def _ref_python_import_from(node: Node, ctx: _RefContext) -> None:
+    source, ids = ctx.source, ctx.ids
+    module_node = node.child_by_field_name("module_name")
+    mod_name = _identifier_at(module_node, source, ids) if module_node else ""
+    imported = []
+    for c in node.children:
+        if c.type == "dotted_name" and c != module_node:
+            imported.append(_identifier_at(c, source, ids))
+        elif c.type == "aliased_import":
+            local = _imported_local_name(c, ctx)
+            if local:
+                imported.append(local)
+        elif c.type == "identifier" and c != module_node:
+            imported.append(_identifier_at(c, source, ids))
+    if imported:
+        ctx.refs.append(Reference(
+            name="__import__", kind="import",
+            line=_line_of(node),
+            imported_names=imported,
+            module_name=mod_name,
+        ))
+
+
+def _ref_python_function(node: Node, ctx: _RefContext) -> None:
+    # Resolve name and return annotation once; every return inside reads them off ctx.functions
+    name_node = node.child_by_field_name("name")
+    func_name = _identifier_at(name_node, ctx.source, ctx.ids) if name_node else ""
+    ret_node = node.child_by_field_name("return_type")
+    declared_ret = _get_python_type_annotation(ret_node, ctx.source, ctx.ids) if ret_node else None
+    ctx.functions.append((node.end_byte, func_name, declared_ret))
+
+
+def _ref_python_return(node: Node, ctx: _RefContext) -> None:
+    # #15: Python return statement extraction
+    # Captures arrive in document order, so functions that ended before this
+    # return are done and the innermost enclosing one is on top of the stack
+    functions = ctx.functions
+    while functions and functions[-1][0] <= node.start_byte:
+        functions.pop()
+    func_name, declared_ret = functions[-1][1:] if functions else ("", None)
+    ret_value = None
+    for c in node.children:
+        if c.type != "return":
+            ret_value = c
+            break
+    ret_type = None
+    if ret_value:
+        ret_type = _infer_type_from_rhs(ret_value)
+    else:
+        ret_type = "None"
+    if declared_ret:
+        ctx.refs.append(Reference(
+            name=func_name, kind="return_value",
+            line=_line_of(node),
+            return_value_type=ret_type,
+            declared_return_type=declared_ret,
+            scope=func_name,
+        ))
+
+
+def _ref_python_assignment(node: Node, ctx: _RefContext) -> None:
+    # #17: Python annotated assignment type tracking
+    type_node = node.child_by_field_name("type")
+    if type_node:
+        annotation = _get_python_type_annotation(type_node, ctx.source, ctx.ids)
+        rhs_node = node.child_by_field_name("right") or (
+            node.children[-1] if len(node.children) >= 3 else None)
+        rhs_type = _infer_type_from_rhs(rhs_node) if rhs_node else None
+        lhs_node = _first_child_of_type(node, "identifier")
+        if lhs_node and annotation and rhs_type:
+            ctx.refs.append(Reference(
+                name=_identifier_at(lhs_node, ctx.source, ctx.ids),
+                kind="assignment",
+                line=_line_of(node),
+                annotation_type=annotation,
+                inferred_type=rhs_type,
+            ))
+
+
+def _ref_c_field(node: Node, ctx: _RefContext) -> None:
+    # #19: C struct member access (field_expression: obj.member or ptr->member)
+    obj = node.child_by_field_name("argument")
+    field_node = node.child_by_field_name("field")
+    if obj and field_node:
+        ctx.refs.append(Reference(
+            name=_identifier_at(obj, ctx.source, ctx.ids), kind="member_access",
+            line=_line_of(node),
+            member_name=_identifier_at(field_node, ctx.source, ctx.ids),
+        ))
+
+
+# Reference query capture name -> handler, per language
+_REFERENCE_HANDLERS = {
+    "python": {
+        "call": _ref_python_call,
+        "subscript": _ref_python_subscript,
+        "identifier": _ref_python_identifier,
+        "import": _ref_python_import,
+        "import_from": _ref_python_import_from,
+        "function": _ref_python_function,
+        "return": _ref_python_return,
+        "assignment": _ref_python_assignment,
+    },
+    "c": {
+        "call": _ref_c_call,
+        "subscript": _ref_c_subscript,
+        "assignment": _ref_c_assignment,
+        "field": _ref_c_field,
+    },
+}
+
+
+def extract_references_from_source(source: bytes, file_path: str, language: Optional[str] = None,
+                                   tree: Optional[Any] = None) -> list[Reference]:
     refs: list[Reference] = []
     if language is None:
-        ext = Path(file_path).suffix.lower()
-        if ext == ".py":
-            language = "python"
-        elif ext in (".c", ".h"):
-            language = "c"
-        else:
+        language = language_for_path(file_path)
+        if language is None:
             return refs
 
     parser = _get_parser(language)
     if parser is None:
         return refs
-    tree = parser.parse(source)
+    query = _get_query(language, "references")
+    if query is None:
+        return refs
+    if tree is None:
+        tree = parser.parse(source)
     if tree.root_node is None:
         return refs
 
-    def walk(node: Node):
-        if node.type in ("call_expression", "call") and language == "python":
-            fn = node.child_by_field_name("function")
-            if fn:
-                name = _source_at(fn, source).strip()
-                args = node.child_by_field_name("arguments")
-                arg_children = [c for c in args.children if c.type not in ("(", ")", ",")] if args else []
-                nargs = len(arg_children)
-                # #18: Infer argument types for type checking
-                inferred_arg_types: list[Optional[str]] = []
-                for ac in arg_children:
-                    t = _infer_type_from_rhs(ac)
-                    if t is None and ac.type == "identifier":
-                        t = None  # checker will look up from symbols
-                    inferred_arg_types.append(t)
-                refs.append(Reference(name=name, kind="call", line=_line_of(node, source),
-                                      arg_count=nargs, arg_types=inferred_arg_types if any(t is not None for t in inferred_arg_types) else None))
-        if node.type in ("call_expression", "call") and language == "c":
-            fn = node.child_by_field_name("function")
-            if fn and fn.type == "identifier":
-                name = _source_at(fn, source).strip()
-                args = node.child_by_field_name("arguments")
-                arg_children = [c for c in args.children if c.type not in ("(", ")", ",")] if args else []
-                nargs = len(arg_children)
-                refs.append(Reference(name=name, kind="call", line=_line_of(node, source), arg_count=nargs))
-                # #12: Format string detection for printf family
-                _PRINTF_FAMILY = {"printf", "fprintf", "sprintf", "snprintf", "scanf", "fscanf", "sscanf"}
-                if name in _PRINTF_FAMILY and arg_children:
-                    fmt_arg_idx = 0
-                    if name in ("fprintf", "fscanf", "sprintf", "sscanf"):
-                        fmt_arg_idx = 1
-                    elif name == "snprintf":
-                        fmt_arg_idx = 2
-                    if fmt_arg_idx < len(arg_children):
-                        fmt_node = arg_children[fmt_arg_idx]
-                        if fmt_node.type == "string_literal":
-                            fmt_str = _source_at(fmt_node, source).strip().strip('"')
-                            specs = re.findall(r'%(?!%)[diouxXeEfFgGaAcspnl*]', fmt_str)
-                            num_specs = len(specs)
-                            actual_fmt_args = nargs - fmt_arg_idx - 1
-                            refs.append(Reference(
-                                name=name, kind="format_call",
-                                line=_line_of(node, source),
-                                arg_count=actual_fmt_args,
-                                format_specifiers=num_specs,
-                                format_string=fmt_str,
-                            ))
-        if node.type in ("subscript_expression", "subscript") and language == "python":
-            obj = node.child_by_field_name("value")
-            idx = node.child_by_field_name("subscript") or node.child_by_field_name("index")
-            if obj and idx:
-                name = _source_at(obj, source).strip()
-                idx_str = _source_at(idx, source).strip()
+    captures = _query_captures(query, tree.root_node)
+    # Python identifiers that are call targets, def names, bare parameters or
+    # attribute parts are not reads; the query tags them so no parent lookups are needed.
+    ctx = _RefContext(source, language, refs, {n.id for n in captures.pop("identifier.skip", ())})
+    handlers = _REFERENCE_HANDLERS[language]
+    for capture, node in _in_document_order(captures):
+        handlers[capture](node, ctx)
+
+    # Fallback for C: scan with regex for identifier[number] (tree-sitter often misses subscript in C)
+    # Only the code between comments/strings is scanned; declaration context (array size) is
+    # skipped and tree-sitter refs are deduped. Nothing is set up unless some candidate exists.
+    if language == "c" and b"[" in source and _C_ARRAY_SUBSCRIPT_RE.search(source):
+        import logging
+        skip_ranges = _get_comment_and_string_ranges_c(source)
+        # Matches arrive in offset order, so lines are counted forward with C-level
+        # bytes.count over each gap; bytes past the last match are never scanned
+        line, line_pos = 1, 0
+        existing_refs = {(r.name, r.line, r.index_value) for r in refs if r.kind == "array_access"}
+        n_before = len(refs)
+        code_start = 0
+        for skip_start, skip_end in skip_ranges + [(len(source), len(source))]:
+            for m in _C_ARRAY_SUBSCRIPT_RE.finditer(source, code_start, skip_start):
+                if _is_array_declarator_context_c(source, m.end()):
+                    continue
+                name = m.group(1).decode("utf-8", errors="replace")
                 try:
-                    index_val = int(idx_str, 0)
+                    index_val = int(m.group(2), 10)
                 except ValueError:
                     index_val = None
-                refs.append(Reference(name=name, kind="array_access", line=_line_of(node, source), index_value=index_val))
-        if node.type == "array_declarator" or (node.type in ("subscript_expression", "subscript") and language == "c"):
-            if language == "c" and node.type in ("subscript_expression", "subscript"):
-                arr = node.child_by_field_name("argument")
-                idx = node.child_by_field_name("index")
-                # Some tree-sitter-c versions use different fields; try positional fallback (array, '[', index, ']').
-                if (not arr or not idx) and len(node.children) >= 4:
-                    arr = node.children[0]
-                    idx = node.children[2]
-                if arr and idx:
-                    name = _source_at(arr, source).strip()
-                    idx_str = _source_at(idx, source).strip()
-                    try:
-                        index_val = int(idx_str, 0)
-                    except ValueError:
-                        index_val = None
-                    refs.append(Reference(name=name, kind="array_access", line=_line_of(node, source), index_value=index_val))
-        if node.type == "identifier" and language == "python":
-            parent = node.parent
-            if parent and parent.type not in ("call_expression", "call", "function_definition", "parameters", "attribute"):
-                name = _source_at(node, source).strip()
-                if name and not name.startswith("_"):
-                    refs.append(Reference(name=name, kind="read", line=_line_of(node, source)))
-        # C: arr[i] = expr – detect array write for type mismatch (e.g. assigning int to char[])
-        if node.type == "assignment_expression" and language == "c":
-            left = node.child_by_field_name("left")
-            right = node.child_by_field_name("right")
-            if left and left.type in ("subscript_expression", "subscript") and right:
-                arr_node = left.child_by_field_name("argument")
-                idx_node = left.child_by_field_name("index")
-                if (not arr_node or not idx_node) and len(left.children) >= 4:
-                    arr_node = left.children[0]
-                    idx_node = left.children[2]
-                if arr_node and idx_node:
-                    name = _source_at(arr_node, source).strip()
-                    idx_str = _source_at(idx_node, source).strip()
-                    try:
-                        index_val = int(idx_str, 0)
-                    except ValueError:
-                        index_val = None
-                    rhs_type = _infer_c_expr_type(right, source)
-                    rhs_name = _source_at(right, source).strip() if right.type == "identifier" else None
-                    refs.append(Reference(
-                        name=name, kind="array_write", line=_line_of(node, source),
-                        index_value=index_val, inferred_type=rhs_type, rhs_name=rhs_name,
-                    ))
+                line += source.count(b"\n", line_pos, m.start())
+                line_pos = m.start()
+                if (name, line, index_val) in existing_refs:
+                    continue
+                existing_refs.add((name, line, index_val))
+                refs.append(Reference(name=name, kind="array_access", line=line, index_value=index_val))
+            code_start = skip_end
+        if len(refs) > n_before:
+            logging.getLogger(__name__).info("C regex fallback added %d array_access ref(s)", len(refs) - n_before)
 
-        # #14: Python import extraction
-        if node.type == "import_statement" and language == "python":
-            imported = []
-            for c in node.children:
-                if c.type == "dotted_name":
-                    imported.append(_source_at(c, source).strip())
-                elif c.type == "aliased_import":
-                    alias_node = c.child_by_field_name("alias")
-                    name_node = c.child_by_field_name("name")
-                    local = alias_node if alias_node else name_node
-                    if local:
-                        imported.append(_source_at(local, source).strip())
-            if imported:
-                refs.append(Reference(
-                    name="__import__", kind="import",
-                    line=_line_of(node, source),
-                    imported_names=imported,
-                ))
+    return refs
 
-        if node.type == "import_from_statement" and language == "python":
-            module_node = node.child_by_field_name("module_name")
-            mod_name = _source_at(module_node, source).strip() if module_node else ""
-            imported = []
-            for c in node.children:
-                if c.type == "dotted_name" and c != module_node:
-                    imported.append(_source_at(c, source).strip())
-                elif c.type == "aliased_import":
-                    alias_node = c.child_by_field_name("alias")
-                    name_node = c.child_by_field_name("name")
-                    local = alias_node if alias_node else name_node
-                    if local:
-                        imported.append(_source_at(local, source).strip())
-                elif c.type == "identifier" and c != module_node:
-                    imported.append(_source_at(c, source).strip())
-            if imported:
-                refs.append(Reference(
-                    name="__import__", kind="import",
-                    line=_line_of(node, source),
-                    imported_names=imported,
-                    module_name=mod_name,
-                ))
 
-        # #15: Python return statement extraction
-        if node.type == "return_statement" and language == "python":
-            parent = node.parent
-            func_name = ""
-            declared_ret = None
-            while parent:
-                if parent.type == "function_definition":
-                    name_node = parent.child_by_field_name("name")
-                    if name_node:
-                        func_name = _source_at(name_node, source).strip()
-                    ret_node = parent.child_by_field_name("return_type")
-                    if ret_node:
-                        declared_ret = _get_python_type_annotation(ret_node, source)
-                    break
-                parent = parent.parent
-            ret_value = None
-            for c in node.children:
-                if c.type != "return":
-                    ret_value = c
-                    break
-            ret_type = None
-            if ret_value:
-                ret_type = _infer_type_from_rhs(ret_value)
-            else:
-                ret_type = "None"
-            if declared_ret:
-                refs.append(Reference(
-                    name=func_name, kind="return_value",
-                    line=_line_of(node, source),
-                    return_value_type=ret_type,
-                    declared_return_type=declared_ret,
-                    scope=func_name,
-                ))
+def _common_prefix_len(a: bytes, b: bytes) -> int:
+    """Length of the shared prefix, found by bisecting with memcmp-backed slice compares."""
+    va, vb = memoryview(a), memoryview(b)
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if va[:mid] == vb[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
 
-        # #17: Python annotated assignment type tracking
-        if node.type == "assignment" and language == "python":
-            type_node = node.child_by_field_name("type")
-            if type_node:
-                annotation = _get_python_type_annotation(type_node, source)
-                rhs_node = node.child_by_field_name("right") or (
-                    node.children[-1] if len(node.children) >= 3 else None)
-                rhs_type = _infer_type_from_rhs(rhs_node) if rhs_node else None
-                lhs_node = None
-                for c in node.children:
-                    if c.type == "identifier":
-                        lhs_node = c
-                        break
-                if lhs_node and annotation and rhs_type:
-                    refs.append(Reference(
-                        name=_source_at(lhs_node, source).strip(),
-                        kind="assignment",
-                        line=_line_of(node, source),
-                        annotation_type=annotation,
-                        inferred_type=rhs_type,
-                    ))
 
-        # #19: C struct member access (field_expression: obj.member or ptr->member)
-        if node.type == "field_expression" and language == "c":
-            obj = node.child_by_field_name("argument")
-            field_node = node.child_by_field_name("field")
-            if obj and field_node:
-                obj_name = _source_at(obj, source).strip()
-                field_name = _source_at(field_node, source).strip()
-                refs.append(Reference(
-                    name=obj_name, kind="member_access",
-                    line=_line_of(node, source),
-                    member_name=field_name,
-                ))
+def _point_at(source: bytes, offset: int) -> tuple[int, int]:
+    return source.count(b"\n", 0, offset), offset - (source.rfind(b"\n", 0, offset) + 1)
 
-        for c in node.children:
-            walk(c)
 
-    walk(tree.root_node)
+class IncrementalExtractor:
+    """Keeps the last tree per file so small edits are re-parsed incrementally.
 
-    # Fallback for C: scan with regex for identifier[number] (tree-sitter often misses subscript in C)
-    # Skip matches inside comments/strings, skip declaration context (array size), dedup with tree-sitter refs
-    if language == "c":
-        import logging
-        skip_ranges = _get_comment_and_string_ranges_c(source)
-        # Build set of existing (name, line, index) to avoid duplicates
-        existing_refs = {(r.name, r.line, r.index_value) for r in refs if r.kind == "array_access"}
-        n_before = len(refs)
-        for m in re.finditer(rb"([a-zA-Z_][a-zA-Z0-9_]*)\s*\[\s*(\d+)\s*\]", source):
-            if _position_in_ranges(m.start(), skip_ranges):
-                continue
-            if _is_array_declarator_context_c(source, m.end()):
-                continue
-            name = m.group(1).decode("utf-8", errors="replace")
-            try:
-                index_val = int(m.group(2), 10)
-            except ValueError:
-                index_val = None
-            line = source[: m.start()].count(b"\n") + 1
-            if (name, line, index_val) in existing_refs:
-                continue
-            existing_refs.add((name, line, index_val))
-            refs.append(Reference(name=name, kind="array_access", line=line, index_value=index_val))
-        if len(refs) > n_before:
-            logging.getLogger(__name__).info("C regex fallback added %d array_access ref(s)", len(refs) - n_before)
+    The cached bytes are diffed against the new source as a single hunk (common
+    prefix + common suffix), applied with tree.edit(), and the edited tree is
+    handed back to the parser so unchanged subtrees are reused."""
 
-    return refs
+    def __init__(self, max_entries: int = 100):
+        self.max_entries = max_entries
+        self._trees: OrderedDict[str, tuple[str, bytes, Any]] = OrderedDict()
+        # Trees are mutated by edit(), so parsing and reading them is serialized
+        self._lock = threading.RLock()
+
+    def parse(self, path: str, new_src: bytes, old_src: Optional[bytes] = None,
+              language: Optional[str] = None) -> Optional[Any]:
+        if language is None:
+            language = language_for_path(path)
+        parser = _get_parser(language) if language else None
+        if parser is None:
+            return None
+        with self._lock:
+            cached = self._trees.get(path)
+            old_tree = None
+            if cached is not None and cached[0] == language and (old_src is None or old_src == cached[1]):
+                old_tree = self._edit_tree(cached[2], cached[1], new_src)
+            tree = parser.parse(new_src, old_tree) if old_tree is not None else parser.parse(new_src)
+            self._trees[path] = (language, new_src, tree)
+            self._trees.move_to_end(path)
+            while len(self._trees) > self.max_entries:
+                self._trees.popitem(last=False)
+            return tree
+
+    def extract(self, path: str, source: bytes,
+                language: Optional[str] = None) -> tuple[list[Symbol], list[Reference]]:
+        """Symbols and references for a buffer from a single (incremental) parse."""
+        if language is None:
+            language = language_for_path(path)
+        with self._lock:
+            tree = self.parse(path, source, language=language)
+            if tree is not None:
+                return (extract_symbols_from_source(source, path, language, tree),
+                        extract_references_from_source(source, path, language, tree))
+        # No grammar for this language: same result as the one-shot extractors,
+        # which for Python means the stdlib-ast symbol fallback
+        return (extract_symbols_from_source(source, path, language),
+                extract_references_from_source(source, path, language))
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._trees.pop(path, None)
+
+    @staticmethod
+    def _edit_tree(tree: Any, old_src: bytes, new_src: bytes) -> Any:
+        if old_src == new_src:
+            return tree
+        start = _common_prefix_len(old_src, new_src)
+        # Common suffix of what follows the prefix, so the two never overlap
+        suffix = _common_prefix_len(old_src[start:][::-1], new_src[start:][::-1])
+        old_end, new_end = len(old_src) - suffix, len(new_src) - suffix
+        tree.edit(
+            start_byte=start, old_end_byte=old_end, new_end_byte=new_end,
+            start_point=_point_at(old_src, start),
+            old_end_point=_point_at(old_src, old_end),
+            new_end_point=_point_at(new_src, new_end),
+        )
+        return tree
@@ -3,20 +3,35 @@ Snipe local analysis server.
 Exposes HTTP API for the VSCode extension: analyze buffer, get repo symbols, get graph.
 """
 from __future__ import annotations
+import atexit
 import json
 import logging
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger(__name__)
 from typing import Any, Optional
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 
 # Run from backend directory so these imports work
-from parser.repo_parser import build_repo_symbol_table
+from parser.repo_parser import build_repo_symbol_table, repo_source_stamp
 from parser.buffer_parser import parse_unsaved_buffer
+from parser.symbol_extractor import intern_symbol_strings
 from analyzer.type_checker import check_type_mismatch
 from analyzer.bounds_checker import check_array_bounds
 from analyzer.signature_checker import check_function_signatures
@@ -30,12 +45,18 @@ from analyzer.safety_checker import check_unsafe_functions
 from analyzer.assignment_checker import check_assignment_types
 from analyzer.arg_type_checker import check_arg_types
 from analyzer.struct_checker import check_struct_access
+from analyzer.repo_index import RepoIndex, build_repo_index
 from graph.repo_graph import build_repo_graph
 from graph.graph_builder import build_d3_graph
 from explainer import get_explainer
 
 
-app = FastAPI(title="Snipe Analysis Server", version="0.1.0")
+# Symbol tables, graphs and diagnostics lists can run to hundreds of KB per response
+app = FastAPI(
+    title="Snipe Analysis Server",
+    version="0.1.0",
+    default_response_class=ORJSONResponse if HAS_ORJSON else JSONResponse,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -44,11 +65,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory repo symbols; (re)built on first analyze or explicit refresh
-_repo_symbols: list[dict[str, Any]] = []
-_repo_path: Optional[str] = None
+
+@dataclass(frozen=True, slots=True)
+class _RepoSnapshot:
+    """Everything derived from one repo scan, published as a unit so readers never
+    pair the symbols of one build with the index or repo_path of another."""
+    repo_path: Optional[str] = None
+    symbols: list = field(default_factory=list)
+    # Dict form handed to the checkers
+    symbol_dicts: list[dict[str, Any]] = field(default_factory=list)
+    index: RepoIndex = field(default_factory=RepoIndex)
+
+
+# In-memory repo symbols; (re)built on first analyze or explicit refresh.
+# Replaced wholesale, never mutated; rebuilds are serialized by _repo_lock.
+_repo_snapshot = _RepoSnapshot()
+_repo_lock = threading.Lock()
 _data_dir: Path = Path(__file__).resolve().parent / "data"
 _symbols_path: Path = _data_dir / "repo_symbols.json"
+_symbol_cache_path: Path = _data_dir / "symbol_cache.pickle"
 
 
 @app.get("/")
@@ -85,13 +120,164 @@ class FixRequest(BaseModel):
     code: str
 
 
-def _ensure_repo_symbols(repo_path: str) -> list[dict]:
-    global _repo_symbols, _repo_path
-    if _repo_path != repo_path or not _repo_symbols:
-        _repo_path = repo_path
-        _symbols_path.parent.mkdir(parents=True, exist_ok=True)
-        _repo_symbols = build_repo_symbol_table(repo_path, output_json_path=_symbols_path)
-    return _repo_symbols
+def _dump_json_indented(data: Any) -> bytes:
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def _load_json_bytes(data: bytes | memoryview) -> Any:
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+
+class _DiagnosticsWriter:
+    """Writes diagnostics.json files off the request thread. Writes are coalesced
+    per path (the newest pending payload wins) and land atomically via os.replace."""
+
+    def __init__(self) -> None:
+        self._pending: dict[Path, Any] = {}
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, path: Path, data: Any) -> None:
+        with self._cond:
+            self._pending[path] = data
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def flush(self) -> None:
+        """Block until every scheduled write has reached disk (or failed and been logged)."""
+        with self._cond:
+            while self._pending or self._busy:
+                if self._thread is None or not self._thread.is_alive():
+                    # Never wait on a dead writer: restart it for whatever is still queued
+                    self._busy = False
+                    if self._pending:
+                        self._ensure_thread()
+                    continue
+                self._cond.wait(timeout=1.0)
+
+    def _ensure_thread(self) -> None:
+        # Caller holds self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="snipe-diag-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, {}
+                self._busy = True
+            try:
+                for path, data in batch.items():
+                    tmp = path.with_name(path.name + ".tmp")
+                    try:
+                        tmp.write_bytes(_dump_json_indented(data))
+                        os.replace(tmp, path)
+                    except Exception as e:
+                        # e.g. OSError, or orjson rejecting an int wider than 64 bits
+                        log.warning("Could not write %s: %s", path, e)
+                        tmp.unlink(missing_ok=True)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+_diagnostics_writer = _DiagnosticsWriter()
+atexit.register(_diagnostics_writer.flush)
+
+# path -> ((st_mtime_ns, st_size), parsed JSON); callers must treat the value as read-only
+_json_file_cache: dict[Path, tuple[tuple[int, int], Any]] = {}
+_RULES_PATH = Path(__file__).resolve().parent / "rules" / "rules.json"
+
+
+def _load_json_cached(path: Path, default: Any) -> Any:
+    """Parse a JSON file, reusing the previous result while its mtime and size are unchanged."""
+    try:
+        st = path.stat()
+    except OSError:
+        _json_file_cache.pop(path, None)
+        return default
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _json_file_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    data = _load_json_bytes(path.read_bytes())
+    _json_file_cache[path] = (stamp, data)
+    return data
+
+
+def _set_repo_symbols(repo_path: str, symbols: list) -> _RepoSnapshot:
+    global _repo_snapshot
+    dicts = [s if isinstance(s, dict) else s.to_dict() for s in symbols]
+    snapshot = _RepoSnapshot(repo_path, symbols, dicts, build_repo_index(dicts))
+    _repo_snapshot = snapshot
+    return snapshot
+
+
+def _symbols_meta_path() -> Path:
+    return _symbols_path.with_suffix(".meta.json")
+
+
+def _load_json_mapped(path: Path) -> Any:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return _load_json_bytes(view)
+
+
+def _load_persisted_symbols(repo_path: str) -> Optional[list]:
+    """Return the on-disk symbol table if it was built for repo_path and no source file
+    has changed since; None when it is missing or stale."""
+    if not _symbols_path.exists() or not _symbols_meta_path().exists():
+        return None
+    try:
+        meta = _load_json_mapped(_symbols_meta_path())
+        if not isinstance(meta, dict) or meta.get("repo_path") != repo_path:
+            return None
+        if any(meta.get(k) != v for k, v in repo_source_stamp(repo_path).items()):
+            return None
+        symbols = _load_json_mapped(_symbols_path)
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring persisted symbol table: %s", e)
+        return None
+    if not isinstance(symbols, list):
+        return None
+    # A JSON load gives every symbol its own copy of kind/type/file_path strings
+    for s in symbols:
+        intern_symbol_strings(s)
+    return symbols
+
+
+def _build_repo_symbols(repo_path: str) -> list[dict]:
+    _symbols_path.parent.mkdir(parents=True, exist_ok=True)
+    # Stamp before scanning so an edit made mid-build leaves the cache stale, not falsely fresh
+    stamp = repo_source_stamp(repo_path)
+    symbols = build_repo_symbol_table(repo_path, output_json_path=_symbols_path, cache_path=_symbol_cache_path)
+    _symbols_meta_path().write_bytes(_dump_json_indented({"repo_path": repo_path, **stamp}))
+    return symbols
+
+
+def _ensure_repo_symbols(repo_path: str) -> _RepoSnapshot:
+    snapshot = _repo_snapshot
+    if snapshot.repo_path == repo_path and snapshot.symbols:
+        return snapshot
+    with _repo_lock:
+        # Another request may have built it while we waited
+        snapshot = _repo_snapshot
+        if snapshot.repo_path != repo_path or not snapshot.symbols:
+            symbols = _load_persisted_symbols(repo_path)
+            if symbols is None:
+                symbols = _build_repo_symbols(repo_path)
+            snapshot = _set_repo_symbols(repo_path, symbols)
+    return snapshot
 
 
 def _diagnostic_to_dict(d: Diagnostic) -> dict:
@@ -104,42 +290,70 @@ def _diagnostic_to_dict(d: Diagnostic) -> dict:
     }
 
 
+def _check_function_signatures(buffer_refs, buffer_symbols, repo_symbols, current_file, repo_index=None):
+    return check_function_signatures(buffer_refs, repo_symbols, current_file, repo_index)
+
+
+# All checkers share the (buffer_refs, buffer_symbols, repo_symbols, current_file) signature
+_BUFFER_CHECKERS = (
+    check_type_mismatch,
+    check_array_bounds,
+    _check_function_signatures,
+    # --- New checks (#9-#19) ---
+    check_undefined_symbols,
+    check_variable_shadowing,
+    check_format_strings,
+    check_unused_externs,
+    check_dead_imports,
+    check_return_types,
+    check_unsafe_functions,
+    check_assignment_types,
+    check_arg_types,
+    check_struct_access,
+)
+# Checkers that also accept the shared repo_index keyword
+_INDEXED_CHECKERS = frozenset({
+    check_type_mismatch,
+    check_array_bounds,
+    _check_function_signatures,
+    check_undefined_symbols,
+    check_variable_shadowing,
+    check_arg_types,
+    check_struct_access,
+})
+_analyze_pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="snipe-check")
+
+
 @app.post("/analyze")
 def analyze(request: AnalyzeRequest) -> dict:
     """Analyze unsaved buffer against repo knowledge graph. Returns diagnostics."""
     repo_path = str(Path(request.repo_path).resolve())
     if not Path(repo_path).is_dir():
         raise HTTPException(status_code=400, detail="Invalid repo_path")
-    repo_symbols = _ensure_repo_symbols(repo_path)
+    snapshot = _ensure_repo_symbols(repo_path)
+    repo_dicts = snapshot.symbol_dicts
+    repo_index = snapshot.index
     buffer_symbols, buffer_refs = parse_unsaved_buffer(
         request.content, request.file_path, request.language
     )
     current_file = request.file_path
+    # The checkers only read their inputs, so they run side by side; results are
+    # still collected in _BUFFER_CHECKERS order so dedup keeps the same first hit.
+    checker_args = (buffer_refs, buffer_symbols, repo_dicts, current_file)
+    futures = [
+        _analyze_pool.submit(check, *checker_args, repo_index=repo_index)
+        if check in _INDEXED_CHECKERS
+        else _analyze_pool.submit(check, *checker_args)
+        for check in _BUFFER_CHECKERS
+    ]
     diagnostics: list[Diagnostic] = []
-    repo_dicts = [s if isinstance(s, dict) else s.to_dict() for s in repo_symbols]
-    diagnostics.extend(check_type_mismatch(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_array_bounds(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_function_signatures(buffer_refs, repo_dicts, current_file))
-    # --- New checks (#9-#19) ---
-    diagnostics.extend(check_undefined_symbols(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_variable_shadowing(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_format_strings(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_unused_externs(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_dead_imports(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_return_types(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_unsafe_functions(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_assignment_types(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_arg_types(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    diagnostics.extend(check_struct_access(buffer_refs, buffer_symbols, repo_dicts, current_file))
-    # Deduplicate diagnostics (same file, line, code, message)
-    seen: set[tuple] = set()
-    unique_diagnostics: list[Diagnostic] = []
+    for future in futures:
+        diagnostics.extend(future.result())
+    # Deduplicate diagnostics (same file, line, code, message); setdefault keeps the first hit
+    unique: dict[tuple, Diagnostic] = {}
     for d in diagnostics:
-        key = (d.file, d.line, d.code, d.message)
-        if key not in seen:
-            seen.add(key)
-            unique_diagnostics.append(d)
-    diagnostics = unique_diagnostics
+        unique.setdefault((d.file, d.line, d.code, d.message), d)
+    diagnostics = list(unique.values())
     log.info("Analyze %s: %d buffer_refs, %d diagnostics", current_file, len(buffer_refs), len(diagnostics))
 
     # Save diagnostics to file for graph error highlighting
@@ -148,8 +362,7 @@ def analyze(request: AnalyzeRequest) -> dict:
 
     diagnostics_file = snipe_dir / "diagnostics.json"
     diagnostics_dict = [_diagnostic_to_dict(d) for d in diagnostics]
-    with open(diagnostics_file, 'w') as f:
-        json.dump(diagnostics_dict, f, indent=2)
+    _diagnostics_writer.schedule(diagnostics_file, diagnostics_dict)
 
     return {
         "diagnostics": diagnostics_dict,
@@ -165,10 +378,9 @@ def refresh(request: RefreshRequest) -> dict:
     log.info("Refresh: raw repo_path=%r resolved=%r is_dir=%s", raw, repo_path, Path(repo_path).is_dir())
     if not Path(repo_path).is_dir():
         raise HTTPException(status_code=400, detail=f"Invalid repo_path: {repo_path!r}")
-    symbols = build_repo_symbol_table(repo_path, output_json_path=_symbols_path)
-    global _repo_symbols, _repo_path
-    _repo_symbols = symbols
-    _repo_path = repo_path
+    with _repo_lock:
+        symbols = _build_repo_symbols(repo_path)
+        _set_repo_symbols(repo_path, symbols)
     log.info("Refresh: extracted %d symbols from %s", len(symbols), repo_path)
     return {"symbol_count": len(symbols), "repo_path": repo_path}
 
@@ -186,8 +398,7 @@ def save_diagnostics(data: dict) -> dict:
     snipe_dir.mkdir(exist_ok=True)
 
     diagnostics_file = snipe_dir / "diagnostics.json"
-    with open(diagnostics_file, 'w') as f:
-        json.dump(diagnostics, f, indent=2)
+    _diagnostics_writer.schedule(diagnostics_file, diagnostics)
 
     log.info("Saved %d diagnostics to %s", len(diagnostics), diagnostics_file)
     return {"saved": len(diagnostics)}
@@ -198,7 +409,7 @@ def get_symbols(repo_path: str) -> dict:
     """Return current repo symbol table (builds if needed)."""
     if not repo_path:
         raise HTTPException(status_code=400, detail="repo_path required")
-    symbols = _ensure_repo_symbols(repo_path)
+    symbols = _ensure_repo_symbols(repo_path).symbols
     return {"symbols": symbols}
 
 
@@ -212,17 +423,17 @@ def get_graph(repo_path: str) -> dict:
         raise HTTPException(status_code=400, detail="repo_path required")
 
     # Get current symbols
-    symbols = _ensure_repo_symbols(repo_path)
+    symbols = _ensure_repo_symbols(repo_path).symbols
 
     # Get current diagnostics for error highlighting
     diagnostics = []
     diagnostics_file = Path(repo_path) / ".snipe" / "diagnostics.json"
-    if diagnostics_file.exists():
-        try:
-            diagnostics_text = diagnostics_file.read_text()
-            diagnostics = json.loads(diagnostics_text)
-        except Exception as e:
-            log.warning(f"Failed to load diagnostics: {e}")
+    # Let a just-scheduled /analyze write land so the highlighting is current
+    _diagnostics_writer.flush()
+    try:
+        diagnostics = _load_json_cached(diagnostics_file, [])
+    except Exception as e:
+        log.warning(f"Failed to load diagnostics: {e}")
 
     # Build dynamic graph with error highlighting
     graph_data = build_repo_graph(symbols, diagnostics, repo_path=repo_path)
@@ -231,7 +442,7 @@ def get_graph(repo_path: str) -> dict:
 
 
 @app.post("/explain")
-def explain_diagnostic(request: ExplainRequest) -> dict:
+async def explain_diagnostic(request: ExplainRequest) -> dict:
     """
     Generate AI-powered explanation for a diagnostic.
     Uses Google Gemini to provide clear, actionable explanations.
@@ -245,7 +456,7 @@ def explain_diagnostic(request: ExplainRequest) -> dict:
         }
 
     try:
-        explanation = explainer.explain_diagnostic(
+        explanation = await explainer.aexplain_diagnostic(
             request.diagnostic,
             request.code_context
         )
@@ -310,11 +521,7 @@ def fix_code(request: FixRequest) -> dict:
 @app.get("/rules")
 def get_rules() -> dict:
     """Return deterministic rule definitions."""
-    rules_file = Path(__file__).resolve().parent / "rules" / "rules.json"
-    if rules_file.exists():
-        with open(rules_file, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {"rules": []}
+    return _load_json_cached(_RULES_PATH, {"rules": []})
 
 
 @app.get("/health")
@@ -12,6 +12,9 @@ sys.path.insert(0, str(ROOT / "backend"))
 from parser.symbol_extractor import (
     extract_symbols_from_source,
     extract_references_from_source,
+    extract_imports,
+    extract_includes,
+    IncrementalExtractor,
     Symbol,
     Reference,
 )
@@ -81,6 +84,16 @@ def test_buffer_parser():
         assert arr_ref.index_value == 12
 
 
+def test_incremental_extractor_matches_full_parse():
+    inc = IncrementalExtractor()
+    before = b"int arr[10];\nint f(void) { return arr[2]; }\n"
+    after = b"int arr[10];\nint f(void) { return arr[12]; }\n"
+    inc.extract("inc.c", before)
+    symbols, refs = inc.extract("inc.c", after)
+    assert [s.to_dict() for s in symbols] == [s.to_dict() for s in extract_symbols_from_source(after, "inc.c")]
+    assert refs == extract_references_from_source(after, "inc.c")
+
+
 def test_type_mismatch():
     buffer_refs = [Reference("x", "read", "float", 1)]
     buffer_symbols = [Symbol("x", "variable", "int", "", 1, "")]
@@ -121,6 +134,16 @@ def test_repo_graph():
     assert len(graph["edges"]) >= 1
 
 
+def test_graph_imports_and_includes():
+    if not extract_symbols_from_source(b"x = 1", "a.py"):
+        return  # regex fallback without tree-sitter also matches comments/strings
+    code = 'from __future__ import annotations\nimport os, sys\n# import nothing\nfrom .pkg import mod as m\nx = "import fake"\n'
+    assert [(i["module"], i["line"]) for i in extract_imports(code, "a.py")] == [
+        ("__future__", 1), ("os", 2), (".pkg", 4)]
+    code = '#include <stdio.h>\n/* #include "no.h" */\n#include "local.h"\n#include CONFIG_H\n'
+    assert [(i["file"], i["line"]) for i in extract_includes(code, "a.c")] == [("stdio.h", 1), ("local.h", 3)]
+
+
 def test_demo_repo_symbols():
     demo = ROOT / "demo_repo"
     if not demo.is_dir():
@@ -636,52 +659,130 @@ def test_unsafe_function_extraction_and_check():
     assert any("strcpy" in d.message for d in diag)
 
 
+def test_repo_index_matches_linear_scan():
+    """Checkers given the shared repo index report exactly what a full table scan does."""
+    from analyzer.repo_index import build_repo_index
+    repo_symbols = build_repo_symbol_table(ROOT / "demo_repo")
+    if not repo_symbols:
+        return
+    index = build_repo_index(repo_symbols)
+    c_code = "int main(void) { int x = arr[99]; return add(1) + missing_name; }\n"
+    py_code = "def f():\n    scores = 1\n    return compute(1, 2, 3, 4) + greet(5) + scores[9] + missing_name\n"
+    found = 0
+    for code, path in ((c_code, "new.c"), (py_code, "new.py")):
+        buffer_symbols, buffer_refs = parse_unsaved_buffer(code, path)
+        for check in (check_type_mismatch, check_array_bounds, check_undefined_symbols,
+                      check_variable_shadowing, check_arg_types, check_struct_access):
+            plain = check(buffer_refs, buffer_symbols, repo_symbols, path)
+            assert check(buffer_refs, buffer_symbols, repo_symbols, path, repo_index=index) == plain
+            found += len(plain)
+        plain = check_function_signatures(buffer_refs, repo_symbols, path)
+        assert check_function_signatures(buffer_refs, repo_symbols, path, index) == plain
+        found += len(plain)
+    assert found > 0
+
+
+def test_repo_symbol_cache_matches_fresh_scan():
+    """A cached rescan returns the same table and still picks up edited files."""
+    import shutil
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = Path(tmp) / "repo"
+        shutil.copytree(ROOT / "demo_repo", repo)
+        cache = Path(tmp) / "symbols.pickle"
+        first = build_repo_symbol_table(repo, cache_path=cache)
+        if not first:
+            return
+        assert cache.exists()
+        assert build_repo_symbol_table(repo, cache_path=cache) == first
+        (repo / "utils.py").write_text((repo / "utils.py").read_text() + "\ndef added_later():\n    pass\n")
+        rescanned = build_repo_symbol_table(repo, cache_path=cache)
+        assert rescanned == build_repo_symbol_table(repo)
+        assert any(s["name"] == "added_later" for s in rescanned)
+
+
+def test_repo_symbol_cache_nested_then_parent_root():
+    """A cache filled by scanning a subdirectory must not leak its relative paths into a parent scan."""
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        inner = Path(tmp) / "outer" / "inner"
+        inner.mkdir(parents=True)
+        (inner / "x.py").write_text("def foo():\n    pass\n")
+        cache = Path(tmp) / "symbols.pickle"
+        if not build_repo_symbol_table(inner, cache_path=cache):
+            return
+        outer = build_repo_symbol_table(inner.parent, cache_path=cache)
+        assert [(s["name"], s["file_path"]) for s in outer] == [("foo", str(Path("inner") / "x.py"))]
+        assert outer == build_repo_symbol_table(inner.parent)
+        assert build_repo_symbol_table(inner, cache_path=cache) == build_repo_symbol_table(inner)
+
+
+def test_repo_source_stamp_sees_renames():
+    """Renaming a file keeps the count and newest mtime but must still change the stamp."""
+    import os
+    import tempfile
+    from parser.repo_parser import repo_source_stamp
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "a.py").write_text("x = 1\n")
+        (Path(tmp) / "b.c").write_text("int y;\n")
+        before = repo_source_stamp(tmp)
+        assert repo_source_stamp(tmp) == before
+        os.rename(Path(tmp) / "a.py", Path(tmp) / "moved.py")
+        after = repo_source_stamp(tmp)
+        assert after["file_count"] == before["file_count"]
+        assert after != before
+
+
+def test_python_ast_fallback_matches_tree_sitter():
+    """The stdlib-ast extractor used without tree-sitter-python agrees on plain code."""
+    from parser.symbol_extractor import _extract_python_symbols_ast
+    code = b"""
+LIMITS = [1, 2, 3]
+name: str = "x"
+
+@decorator
+def greet(who: str, greeting: str = "Hi", *args, **kwargs) -> str:
+    count = 0
+    return greeting
+
+class Config:
+    host: str = "localhost"
+    port = 8080
+
+    def load(self, path, strict=False):
+        pass
+"""
+    fallback = _extract_python_symbols_ast(code, "cfg.py")
+    by_name = {s.name: s for s in fallback}
+    assert by_name["LIMITS"].kind == "array" and by_name["LIMITS"].array_size == 3
+    assert by_name["greet"].is_variadic and by_name["greet"].return_type == "str"
+    assert [p["name"] for p in by_name["greet"].params] == ["who", "greeting", "*args", "**kwargs"]
+    assert by_name["count"].scope == "greet"
+    assert by_name["load"].scope == "Config"
+    assert [p["has_default"] for p in by_name["load"].params] == [False, True]
+    assert _extract_python_symbols_ast(b"def broken(:\n", "bad.py") == []
+    symbols = extract_symbols_from_source(code, "cfg.py", "python")
+    if not symbols:
+        return
+    assert [s.to_dict() for s in fallback] == [s.to_dict() for s in symbols]
+
+
+def test_buffer_parse_without_python_grammar(monkeypatch):
+    """Editor buffers still get the ast-fallback symbols when tree-sitter-python is missing."""
+    import parser.symbol_extractor as symbol_extractor
+    real_get_parser = symbol_extractor._get_parser
+    monkeypatch.setattr(symbol_extractor, "_get_parser",
+                        lambda lang: None if lang == "python" else real_get_parser(lang))
+    code = "def f(x):\n    return x\n"
+    symbols, refs = parse_unsaved_buffer(code, "no_grammar.py")
+    assert [s.name for s in symbols] == ["f"]
+    assert [s.to_dict() for s in symbols] == [
+        s.to_dict() for s in extract_symbols_from_source(code.encode(), "no_grammar.py")
+    ]
+    assert refs == []
+
+
 if __name__ == "__main__":
-    test_python_symbol_extraction()
-    test_c_symbol_extraction()
-    test_python_references()
-    test_buffer_parser()
-    test_type_mismatch()
-    test_array_bounds()
-    test_signature_drift()
-    test_repo_graph()
-    test_demo_repo_symbols()
-    test_python_type_annotations()
-    test_python_default_params()
-    test_signature_drift_with_defaults()
-    test_python_variadic_args()
-    test_python_list_size()
-    test_python_list_bounds()
-    test_python_dataclass_fields()
-    test_c_analysis_unchanged()
-    # New tests for checks #9-#19
-    test_undefined_symbol_python()
-    test_undefined_symbol_builtin_no_false_positive()
-    test_undefined_function_call_c()
-    test_stdlib_function_no_false_positive()
-    test_undefined_function_python()
-    test_defined_function_no_false_positive()
-    test_variable_shadowing()
-    test_no_shadowing_when_no_conflict()
-    test_format_string_mismatch()
-    test_format_string_correct()
-    test_unused_extern()
-    test_used_extern_no_false_positive()
-    test_dead_import()
-    test_all_imports_used_no_false_positive()
-    test_return_type_mismatch()
-    test_return_type_correct()
-    test_unsafe_function()
-    test_gets_is_error()
-    test_safe_function_no_false_positive()
-    test_unsafe_function_categories()
-    test_assignment_type_mismatch()
-    test_assignment_type_correct()
-    test_arg_type_mismatch()
-    test_arg_type_correct()
-    test_struct_member_access_invalid()
-    test_struct_member_access_valid()
-    test_format_string_extraction_and_check()
-    test_python_import_extraction()
-    test_unsafe_function_extraction_and_check()
-    print("All tests passed.")
+    # Collect every test_* function so none can be left off a hand-kept call list
+    import pytest
+    raise SystemExit(pytest.main([__file__, "-q"]))